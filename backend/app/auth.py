@@ -1,13 +1,51 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from jose import JWTError, jwt
+from pydantic import BaseModel
 from app.models import User
-from app.database import get_user_by_email
+from app import crud
 from passlib.context import CryptContext
+from datetime import datetime, timedelta
 from typing import Optional
+import logging
+import os
+import secrets
+
+logger = logging.getLogger(__name__)
+
+SECRET_KEY = os.getenv("SECRET_KEY")
+# Without SECRET_KEY each process signs with its own random key, so tokens stop
+# validating after a restart and on any other worker; see warn_if_ephemeral_key()
+EPHEMERAL_SECRET_KEY = not SECRET_KEY
+if EPHEMERAL_SECRET_KEY:
+    SECRET_KEY = secrets.token_urlsafe(32)
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 
 security = HTTPBearer()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+class TokenData(BaseModel):
+    """Claims carried by an access token"""
+    user_id: str
+    role: str
+    email: Optional[str] = None
+
+def warn_if_ephemeral_key():
+    """Log once at startup when access tokens are signed with a per-process random key"""
+    if EPHEMERAL_SECRET_KEY:
+        logger.warning("auth.ephemeral_secret_key", extra={
+            "detail": "SECRET_KEY is not set; access tokens are signed with a random per-process key "
+                      "and stop validating after a restart or on other workers"
+        })
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid authentication credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -16,39 +54,73 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
-    """Get the current authenticated user"""
-    token = credentials.credentials
-    
-    # For this system, we'll use email as the token (simplified approach)
-    # In production, you'd want to use proper JWT tokens
+def create_access_token(user: User) -> str:
+    """Sign a JWT carrying the user's ID and role"""
+    now = datetime.utcnow()
+    claims = {
+        "sub": str(user.id),
+        "role": user.role,
+        "email": user.email,
+        "iat": now,
+        "exp": now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    }
+    return jwt.encode(claims, SECRET_KEY, algorithm=JWT_ALGORITHM)
+
+def decode_access_token(token: str) -> TokenData:
+    """Verify a token's signature and expiry locally; raises 401 if it is invalid"""
     try:
-        user = await get_user_by_email(token)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return user
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        raise credentials_exception()
+    if not claims.get("sub") or not claims.get("role"):
+        raise credentials_exception()
+    return TokenData(user_id=claims["sub"], role=claims["role"], email=claims.get("email"))
+
+async def get_token_data(credentials: HTTPAuthorizationCredentials = Depends(security)) -> TokenData:
+    """Authenticate from the token alone, without a database lookup"""
+    return decode_access_token(credentials.credentials)
+
+def require_role(*roles: str):
+    """Dependency that allows only tokens carrying one of the given roles"""
+    async def check_role(token: TokenData = Depends(get_token_data)) -> TokenData:
+        if token.role not in roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+        return token
+    return check_role
+
+async def get_current_user(token: TokenData = Depends(get_token_data)) -> User:
+    """Get the current authenticated user's full record (from the user cache)"""
+    try:
+        user = await crud.get_cached_user_by_id(token.user_id)
     except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        user = None
+    if not user:
+        raise credentials_exception()
+    return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Get the current active user"""
     return current_user
 
-# Alternative authentication method for chatbot that doesn't require tokens
-async def get_current_user_chat(email: str = None) -> Optional[User]:
-    """Get user by email for chatbot (simplified auth)"""
-    if not email:
-        return None
-    try:
-        user = await get_user_by_email(email)
+# Alternative authentication method for chatbot
+async def get_current_user_chat(email: str = None, token: str = None) -> Optional[User]:
+    """Get the chatbot user from an access token, or from the email when no token is sent (simplified auth).
+
+    A token that is present but invalid or expired is rejected with 401 rather
+    than falling back to the email, so the client has to log in again.
+    """
+    if token:
+        token_data = decode_access_token(token)
+        try:
+            user = await crud.get_cached_user_by_id(token_data.user_id)
+        except Exception:
+            user = None
+        if not user:
+            raise credentials_exception()
         return user
-    except Exception:
-        return None
+    if email:
+        try:
+            return await crud.get_cached_user_by_email(email)
+        except Exception:
+            pass
+    return None
@@ -2,18 +2,49 @@ from app import schemas
 from app.database import (
     get_student as db_get_student,
     get_students as db_get_students,
+    get_student_by_user_id as db_get_student_by_user_id,
+    get_students_by_user_ids as db_get_students_by_user_ids,
+    count_students as db_count_students,
     create_student as db_create_student,
     update_student as db_update_student,
     delete_student as db_delete_student,
     create_prediction as db_create_prediction,
+    create_predictions_bulk as db_create_predictions_bulk,
     get_predictions_by_student as db_get_predictions_by_student,
     get_user_by_email as db_get_user_by_email,
     create_user as db_create_user,
     get_user_by_id as db_get_user_by_id,
-    get_users as db_get_users
+    get_users as db_get_users,
+    aggregate_students as db_aggregate_students,
+    stream_student_batches as db_stream_student_batches,
+    upsert_students_by_email as db_upsert_students_by_email,
+    get_student_documents as db_get_student_documents,
+    get_job_checkpoint as db_get_job_checkpoint,
+    save_job_checkpoint as db_save_job_checkpoint
 )
 from app.models import Student, Prediction, User
 from typing import List, Optional
+from datetime import datetime
+from bson import ObjectId
+import base64
+import json
+import os
+import time
+
+STUDENT_COUNT_TTL = float(os.getenv("STUDENT_COUNT_TTL", "30"))  # seconds
+STUDENT_COUNT_CACHE_SIZE = int(os.getenv("STUDENT_COUNT_CACHE_SIZE", "1000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))  # seconds
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+# Cached student counts keyed by filter: {filter_key: (expires_at, count)}
+_student_count_cache = {}
+# Bumped by every invalidation, so a count read before a write is not cached after it
+_student_count_generation = 0
+# Fields count_students can filter on; editing one of them changes the filtered counts
+STUDENT_COUNT_FILTERS = ("major", "enrollment_year")
+
+# Cached user records keyed by ("id", user_id) or ("email", email): {key: (expires_at, user)}
+_user_cache = {}
 
 async def get_student(student_id: str) -> Optional[Student]:
     return await db_get_student(student_id)
@@ -21,18 +52,84 @@ async def get_student(student_id: str) -> Optional[Student]:
 async def get_students(skip: int = 0, limit: int = 100) -> List[Student]:
     return await db_get_students(skip, limit)
 
+async def get_student_by_user_id(user_id: str) -> Optional[Student]:
+    return await db_get_student_by_user_id(user_id)
+
+async def get_students_by_user_ids(user_ids: List[str]) -> List[Student]:
+    return await db_get_students_by_user_ids(user_ids)
+
+async def count_students(major: Optional[str] = None, enrollment_year: Optional[int] = None) -> int:
+    """Count students matching the filters, served from a short-TTL cache"""
+    filters = {}
+    if major is not None:
+        filters["major"] = major
+    if enrollment_year is not None:
+        filters["enrollment_year"] = enrollment_year
+
+    key = tuple(sorted(filters.items()))
+    cached = _student_count_cache.get(key)
+    now = time.monotonic()
+    if cached and cached[0] > now:
+        return cached[1]
+
+    generation = _student_count_generation
+    count = await db_count_students(filters)
+    if generation == _student_count_generation:
+        if len(_student_count_cache) >= STUDENT_COUNT_CACHE_SIZE:
+            _student_count_cache.pop(next(iter(_student_count_cache)))  # Drop the oldest entry
+        _student_count_cache[key] = (now + STUDENT_COUNT_TTL, count)
+    return count
+
+def _invalidate_student_counts():
+    """Drop cached counts; called once a write has completed"""
+    global _student_count_generation
+    _student_count_generation += 1
+    _student_count_cache.clear()
+
 async def create_student(student: schemas.StudentCreate) -> Student:
-    return await db_create_student(student.dict())
+    try:
+        return await db_create_student(student.dict())
+    finally:
+        _invalidate_student_counts()
 
 async def update_student(student_id: str, student: schemas.StudentUpdate) -> Optional[Student]:
-    return await db_update_student(student_id, student.dict(exclude_unset=True))
+    update_data = student.dict(exclude_unset=True)
+    try:
+        return await db_update_student(student_id, update_data)
+    finally:
+        if any(field in update_data for field in STUDENT_COUNT_FILTERS):
+            _invalidate_student_counts()
 
 async def delete_student(student_id: str) -> bool:
-    return await db_delete_student(student_id)
+    try:
+        return await db_delete_student(student_id)
+    finally:
+        _invalidate_student_counts()
 
 async def create_prediction(prediction: schemas.PredictionCreate) -> Prediction:
     return await db_create_prediction(prediction.dict())
 
+async def create_predictions_bulk(predictions: List[schemas.PredictionCreate], created_at: datetime) -> int:
+    return await db_create_predictions_bulk([{**p.dict(), "created_at": created_at} for p in predictions])
+
+async def upsert_students(students: List[schemas.StudentCreate]):
+    try:
+        return await db_upsert_students_by_email([student.dict() for student in students])
+    finally:
+        _invalidate_student_counts()
+
+async def get_student_documents(student_ids: List[str], projection: Optional[dict] = None) -> List[dict]:
+    return await db_get_student_documents(student_ids, projection)
+
+def stream_student_batches(batch_size: int, after_id: Optional[str] = None, projection: Optional[dict] = None):
+    return db_stream_student_batches(batch_size, after_id, projection)
+
+async def get_job_checkpoint(job_id: str) -> Optional[dict]:
+    return await db_get_job_checkpoint(job_id)
+
+async def save_job_checkpoint(job_id: str, fields: dict):
+    await db_save_job_checkpoint(job_id, fields)
+
 async def get_all_predictions():
     """Get all predictions"""
     return await Prediction.find().to_list(1000)
@@ -53,57 +150,60 @@ async def get_user_by_id(user_id: str) -> Optional[User]:
 async def get_users(skip: int = 0, limit: int = 100) -> List[User]:
     return await db_get_users(skip, limit)
 
+async def _get_cached_user(key, load) -> Optional[User]:
+    cached = _user_cache.get(key)
+    now = time.monotonic()
+    if cached and cached[0] > now:
+        return cached[1]
+
+    user = await load()
+    if user is not None:
+        if len(_user_cache) >= USER_CACHE_SIZE:
+            _user_cache.pop(next(iter(_user_cache)))  # Drop the oldest entry
+        _user_cache[key] = (now + USER_CACHE_TTL, user)
+    return user
+
+async def get_cached_user_by_id(user_id: str) -> Optional[User]:
+    """User record served from a short-TTL cache; unknown users are not cached"""
+    return await _get_cached_user(("id", user_id), lambda: db_get_user_by_id(user_id))
+
+async def get_cached_user_by_email(email: str) -> Optional[User]:
+    return await _get_cached_user(("email", email), lambda: db_get_user_by_email(email))
+
+def _performance_count(level: str):
+    return {"$sum": {"$cond": [{"$eq": ["$current_prediction.predicted_performance", level]}, 1, 0]}}
+
+def _year_group_pipeline():
+    """Group students by enrollment year along with the distribution of their current predictions"""
+    return [
+        {"$group": {
+            "_id": "$enrollment_year",
+            "total_students": {"$sum": 1},
+            "average_gpa": {"$avg": "$previous_gpa"},
+            "average_attendance": {"$avg": "$attendance_percentage"},
+            "high": _performance_count("High"),
+            "medium": _performance_count("Medium"),
+            "low": _performance_count("Low")
+        }},
+        {"$sort": {"_id": 1}}
+    ]
+
 async def get_performance_trends():
     """Get real performance trends from database"""
     try:
-        # Get all students and predictions
-        students = await get_students()
-        predictions = await get_all_predictions()
-        
-        # Group by enrollment year for trends
-        trends_by_year = {}
-        
-        for student in students:
-            year = student.enrollment_year
-            if year not in trends_by_year:
-                trends_by_year[year] = {
-                    "total_students": 0,
-                    "total_gpa": 0,
-                    "total_attendance": 0,
-                    "predictions": []
-                }
-            
-            trends_by_year[year]["total_students"] += 1
-            trends_by_year[year]["total_gpa"] += student.previous_gpa
-            trends_by_year[year]["total_attendance"] += student.attendance_percentage
-            
-            # Find prediction for this student
-            student_id = str(student.id)
-            prediction = next((p for p in predictions if p.student_id == student_id), None)
-            if prediction:
-                trends_by_year[year]["predictions"].append(prediction)
-        
-        # Calculate averages
+        groups = await db_aggregate_students(_year_group_pipeline())
+
         trends = []
-        for year in sorted(trends_by_year.keys()):
-            data = trends_by_year[year]
-            avg_gpa = data["total_gpa"] / data["total_students"] if data["total_students"] > 0 else 0
-            avg_attendance = data["total_attendance"] / data["total_students"] if data["total_students"] > 0 else 0
-            
-            # Calculate performance distribution
-            high_count = len([p for p in data["predictions"] if p.predicted_performance == "High"])
-            medium_count = len([p for p in data["predictions"] if p.predicted_performance == "Medium"])
-            low_count = len([p for p in data["predictions"] if p.predicted_performance == "Low"])
-            
+        for data in groups:
             trends.append({
-                "year": year,
-                "average_gpa": round(avg_gpa, 2),
-                "attendance_rate": round(avg_attendance, 1),
+                "year": data["_id"],
+                "average_gpa": round(data["average_gpa"] or 0, 2),
+                "attendance_rate": round(data["average_attendance"] or 0, 1),
                 "total_students": data["total_students"],
                 "performance_distribution": {
-                    "high": high_count,
-                    "medium": medium_count,
-                    "low": low_count
+                    "high": data["high"],
+                    "medium": data["medium"],
+                    "low": data["low"]
                 }
             })
         
@@ -115,32 +215,23 @@ async def get_performance_trends():
 async def get_at_risk_students():
     """Get real at-risk students from database"""
     try:
-        # Get all students and predictions
-        students = await get_students()
-        predictions = await get_all_predictions()
-        
-        at_risk_students = []
-        
-        for student in students:
-            student_id = str(student.id)
-            prediction = next((p for p in predictions if p.student_id == student_id), None)
-            
-            if prediction and prediction.risk_score >= 0.7:
-                at_risk_students.append({
-                    "student_id": student_id,
-                    "name": student.name,
-                    "email": student.email,
-                    "risk_score": prediction.risk_score,
-                    "predicted_performance": prediction.predicted_performance,
-                    "gpa": student.previous_gpa,
-                    "attendance_percentage": student.attendance_percentage,
-                    "recommendations": prediction.recommendations
-                })
-        
-        # Sort by risk score (highest first)
-        at_risk_students.sort(key=lambda x: x["risk_score"], reverse=True)
-        
-        return at_risk_students
+        pipeline = [
+            {"$match": {"current_prediction.risk_score": {"$gte": 0.7}}},
+            # Sort by risk score (highest first)
+            {"$sort": {"current_prediction.risk_score": -1}},
+            {"$project": {
+                "_id": 0,
+                "student_id": {"$toString": "$_id"},
+                "name": 1,
+                "email": 1,
+                "risk_score": "$current_prediction.risk_score",
+                "predicted_performance": "$current_prediction.predicted_performance",
+                "gpa": "$previous_gpa",
+                "attendance_percentage": 1,
+                "recommendations": "$current_prediction.recommendations"
+            }}
+        ]
+        return await db_aggregate_students(pipeline)
     except Exception as e:
         print(f"Error getting at-risk students: {e}")
         return []
@@ -148,59 +239,156 @@ async def get_at_risk_students():
 async def get_cohort_comparison():
     """Get real cohort comparison data from database"""
     try:
-        # Get all students and predictions
-        students = await get_students()
-        predictions = await get_all_predictions()
-        
-        # Group by enrollment year
-        cohorts = {}
-        
-        for student in students:
-            year = student.enrollment_year
-            if year not in cohorts:
-                cohorts[year] = {
-                    "total_students": 0,
-                    "total_gpa": 0,
-                    "predictions": []
-                }
-            
-            cohorts[year]["total_students"] += 1
-            cohorts[year]["total_gpa"] += student.previous_gpa
-            
-            # Find prediction for this student
-            student_id = str(student.id)
-            prediction = next((p for p in predictions if p.student_id == student_id), None)
-            if prediction:
-                cohorts[year]["predictions"].append(prediction)
-        
+        groups = await db_aggregate_students(_year_group_pipeline())
+
         # Calculate cohort statistics
         comparison = []
-        for year in sorted(cohorts.keys()):
-            data = cohorts[year]
-            avg_gpa = data["total_gpa"] / data["total_students"] if data["total_students"] > 0 else 0
-            
-            # Calculate performance distribution
-            high_count = len([p for p in data["predictions"] if p.predicted_performance == "High"])
-            medium_count = len([p for p in data["predictions"] if p.predicted_performance == "Medium"])
-            low_count = len([p for p in data["predictions"] if p.predicted_performance == "Low"])
-            
+        for data in groups:
+            total_students = data["total_students"]
+
             # Mock graduation rate based on performance (in real system, this would be actual data)
-            high_performers_rate = (high_count + medium_count) / data["total_students"] if data["total_students"] > 0 else 0
+            high_performers_rate = (data["high"] + data["medium"]) / total_students if total_students > 0 else 0
             graduation_rate = min(95, 75 + (high_performers_rate * 20))  # Estimate based on performance
             
             comparison.append({
-                "cohort": str(year),
-                "average_gpa": round(avg_gpa, 2),
+                "cohort": str(data["_id"]),
+                "average_gpa": round(data["average_gpa"] or 0, 2),
                 "graduation_rate": round(graduation_rate, 1),
-                "total_students": data["total_students"],
+                "total_students": total_students,
                 "performance_distribution": {
-                    "high": high_count,
-                    "medium": medium_count,
-                    "low": low_count
+                    "high": data["high"],
+                    "medium": data["medium"],
+                    "low": data["low"]
                 }
             })
         
         return {"comparison": comparison}
     except Exception as e:
         print(f"Error getting cohort comparison: {e}")
-        return {"comparison": []}
\ No newline at end of file
+        return {"comparison": []}
+
+
+# Columns list views may request from the paginated dashboard endpoint
+DASHBOARD_STUDENT_FIELDS = [
+    "name", "email", "enrollment_year", "major", "attendance_percentage",
+    "internal_marks", "assignment_scores", "lab_performance", "previous_gpa",
+    "study_hours", "participation_metrics"
+]
+DASHBOARD_PREDICTION_FIELDS = ["predicted_performance", "risk_score", "recommendations"]
+DASHBOARD_DEFAULT_FIELDS = DASHBOARD_STUDENT_FIELDS + ["predicted_performance", "risk_score"]
+DASHBOARD_SORT_FIELDS = {"id": "_id", "risk_score": "risk_sort"}
+
+def encode_cursor(sort_value, student_id) -> str:
+    raw = json.dumps([sort_value, str(student_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        sort_value, student_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return sort_value, ObjectId(student_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+async def get_dashboard_page(
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    fields: Optional[List[str]] = None,
+    sort_by: str = "id",
+    order: str = "asc",
+    major: Optional[str] = None,
+    enrollment_year: Optional[int] = None,
+    min_risk: Optional[float] = None,
+    max_risk: Optional[float] = None
+):
+    """Keyset-paginated dashboard rows with field projection, sorting and filtering"""
+    fields = fields or DASHBOARD_DEFAULT_FIELDS
+    unknown = set(fields) - set(DASHBOARD_STUDENT_FIELDS) - set(DASHBOARD_PREDICTION_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    if sort_by not in DASHBOARD_SORT_FIELDS:
+        raise ValueError(f"sort_by must be one of: {', '.join(DASHBOARD_SORT_FIELDS)}")
+    if order not in ("asc", "desc"):
+        raise ValueError("order must be 'asc' or 'desc'")
+
+    sort_field = DASHBOARD_SORT_FIELDS[sort_by]
+    direction = 1 if order == "asc" else -1
+
+    student_filter = {}
+    if major is not None:
+        student_filter["major"] = major
+    if enrollment_year is not None:
+        student_filter["enrollment_year"] = enrollment_year
+    risk_filter = {}
+    if min_risk is not None:
+        risk_filter["$gte"] = min_risk
+    if max_risk is not None:
+        risk_filter["$lte"] = max_risk
+    if risk_filter:
+        student_filter["current_prediction.risk_score"] = risk_filter
+
+    pipeline = [{"$match": student_filter}]
+    if sort_field != "_id":
+        # Students without a prediction sort below every real risk score
+        pipeline.append({"$addFields": {"risk_sort": {"$ifNull": ["$current_prediction.risk_score", -1]}}})
+
+    if cursor:
+        last_value, last_id = decode_cursor(cursor)
+        compare = "$gt" if direction == 1 else "$lt"
+        if sort_field == "_id":
+            pipeline.append({"$match": {"_id": {compare: last_id}}})
+        else:
+            pipeline.append({"$match": {"$or": [
+                {sort_field: {compare: last_value}},
+                {sort_field: last_value, "_id": {"$gt": last_id}}
+            ]}})
+
+    sort = {sort_field: direction}
+    if sort_field != "_id":
+        sort["_id"] = 1
+    # Fetch one extra row to know whether another page exists
+    pipeline += [{"$sort": sort}, {"$limit": limit + 1}]
+
+    prediction_fields = [f for f in fields if f in DASHBOARD_PREDICTION_FIELDS]
+    projection = {"_id": 1, "risk_sort": 1}
+    projection.update({f: 1 for f in fields if f in DASHBOARD_STUDENT_FIELDS})
+    projection.update({f"current_prediction.{f}": 1 for f in prediction_fields})
+    pipeline.append({"$project": projection})
+
+    rows = await db_aggregate_students(pipeline)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = []
+    for row in rows:
+        student = {"id": str(row["_id"])}
+        student.update({f: row.get(f) for f in fields if f in DASHBOARD_STUDENT_FIELDS})
+        prediction = row.get("current_prediction")
+        items.append({
+            "student": student,
+            "prediction": {f: prediction.get(f) for f in prediction_fields} if prediction and prediction_fields else None
+        })
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        last_value = None if sort_field == "_id" else last["risk_sort"]
+        next_cursor = encode_cursor(last_value, last["_id"])
+
+    return {"students": items, "next_cursor": next_cursor}
+
+async def get_dashboard_stats():
+    """Aggregate dashboard statistics over every student in a single pipeline"""
+    pipeline = [
+        {"$group": {
+            "_id": None,
+            "total_students": {"$sum": 1},
+            "students_with_predictions": {"$sum": {"$cond": [{"$ifNull": ["$current_prediction", False]}, 1, 0]}},
+            "at_risk_students": {"$sum": {"$cond": [{"$gte": ["$current_prediction.risk_score", 0.6]}, 1, 0]}},
+            "high_performers": _performance_count("High")
+        }},
+        {"$project": {"_id": 0}}
+    ]
+    rows = await db_aggregate_students(pipeline)
+    if not rows:
+        return {"total_students": 0, "students_with_predictions": 0, "at_risk_students": 0, "high_performers": 0}
+    return rows[0]
@@ -1,26 +1,75 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
+from beanie.operators import In
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
 import os
+import re
 from datetime import datetime
+from typing import Optional
 from app.models import Student, Prediction, User
 
+DUPLICATE_KEY_ERROR = 11000
+
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017/student_performance")
 
 client = AsyncIOMotorClient(MONGODB_URL)
 database = client.student_performance
 
+DOCUMENT_MODELS = [Student, Prediction, User]
+
+async def get_index_names():
+    """Return the existing index names for every collection backing a document model"""
+    index_names = {}
+    for model in DOCUMENT_MODELS:
+        collection = model.Settings.name
+        index_names[collection] = set((await database[collection].index_information()).keys())
+    return index_names
+
+def failed_index(error: OperationFailure) -> str:
+    """Name or key pattern of the index an index build error refers to"""
+    match = re.search(r"index: (\S+)", str(error))
+    if match:
+        return match.group(1)
+    key_pattern = (error.details or {}).get("keyPattern")
+    return str(key_pattern) if key_pattern else "unknown index"
+
 async def init_db():
     """Initialize MongoDB connection and Beanie ODM"""
     print("Connecting to MongoDB...")
     try:
         # Test the connection
         await client.admin.command('ping')
-        await init_beanie(database=database, document_models=[Student, Prediction, User])
-        print("MongoDB connected successfully!")
     except Exception as e:
         print(f"MongoDB connection failed: {e}")
         print("Continuing without database connection...")
         # Don't raise exception, let the app start without DB
+        return
+
+    existing_indexes = await get_index_names()
+    # One model at a time so an index build failure names its collection
+    for model in DOCUMENT_MODELS:
+        try:
+            # Beanie creates any declared indexes that are missing
+            await init_beanie(database=database, document_models=[model])
+        except OperationFailure as e:
+            # E.g. a unique index over existing duplicates; serving without it would be unsafe
+            raise RuntimeError(
+                f"Could not create index {failed_index(e)} on {model.Settings.name}: {e}. "
+                "Fix the conflicting documents and restart."
+            ) from e
+    print("MongoDB connected successfully!")
+
+    current_indexes = await get_index_names()
+    for collection, names in current_indexes.items():
+        created = sorted(names - existing_indexes[collection] - {"_id_"})
+        if created:
+            print(f"Created missing indexes on {collection}: {', '.join(created)}")
+
+    backfilled = await backfill_current_predictions()
+    if backfilled:
+        print(f"Backfilled current_prediction for {backfilled} students")
 
 # Database CRUD operations
 async def get_student(student_id: str):
@@ -29,6 +78,18 @@ async def get_student(student_id: str):
 async def get_students(skip: int = 0, limit: int = 100):
     return await Student.find().skip(skip).limit(limit).to_list()
 
+async def get_student_by_user_id(user_id: str):
+    return await Student.find_one(Student.user_id == user_id)
+
+async def get_students_by_user_ids(user_ids):
+    return await Student.find(In(Student.user_id, list(user_ids))).to_list()
+
+async def count_students(filters=None):
+    if not filters:
+        # Metadata-based count; no collection scan
+        return await Student.get_motor_collection().estimated_document_count()
+    return await Student.find(filters).count()
+
 async def create_student(student_data):
     student = Student(**student_data)
     await student.insert()
@@ -37,10 +98,8 @@ async def create_student(student_data):
 async def update_student(student_id: str, update_data):
     student = await Student.get(student_id)
     if student:
-        for key, value in update_data.items():
-            setattr(student, key, value)
-        student.updated_at = datetime.utcnow()
-        await student.save()
+        # $set only the changed fields so a concurrent current_prediction update is not overwritten
+        await student.set({**update_data, "updated_at": datetime.utcnow()})
     return student
 
 async def delete_student(student_id: str):
@@ -50,14 +109,167 @@ async def delete_student(student_id: str):
         return True
     return False
 
+def current_prediction_fields(prediction: dict):
+    return {
+        "prediction_id": str(prediction["_id"]),
+        "predicted_performance": prediction["predicted_performance"],
+        "risk_score": prediction["risk_score"],
+        "recommendations": prediction["recommendations"],
+        "feature_fingerprint": prediction.get("feature_fingerprint"),
+        "model_version": prediction.get("model_version"),
+        "created_at": prediction["created_at"]
+    }
+
+def current_prediction_update(prediction: dict):
+    """Filter and update that point the student at this prediction unless a newer one is already current"""
+    return (
+        {
+            "_id": ObjectId(prediction["student_id"]),
+            "$or": [
+                {"current_prediction": None},
+                {"current_prediction.created_at": {"$lte": prediction["created_at"]}}
+            ]
+        },
+        {"$set": {"current_prediction": current_prediction_fields(prediction)}}
+    )
+
+async def set_current_prediction(prediction: Prediction):
+    """Atomically point the student at this prediction unless a newer one is already current"""
+    await Student.get_motor_collection().update_one(
+        *current_prediction_update({"_id": prediction.id, **prediction.dict()})
+    )
+
 async def create_prediction(prediction_data):
     prediction = Prediction(**prediction_data)
     await prediction.insert()
+    if ObjectId.is_valid(prediction.student_id):
+        await set_current_prediction(prediction)
     return prediction
 
+async def create_predictions_bulk(predictions):
+    """Insert many prediction dicts at once and make each its student's current prediction"""
+    if not predictions:
+        return 0
+    # insert_many sets the generated _id on each dict
+    result = await Prediction.get_motor_collection().insert_many(predictions, ordered=False)
+    operations = [
+        UpdateOne(*current_prediction_update(prediction))
+        for prediction in predictions if ObjectId.is_valid(prediction["student_id"])
+    ]
+    if operations:
+        await Student.get_motor_collection().bulk_write(operations, ordered=False)
+    return len(result.inserted_ids)
+
 async def get_predictions_by_student(student_id: str):
     return await Prediction.find(Prediction.student_id == student_id).to_list()
 
+async def backfill_current_predictions(batch_size: int = 1000):
+    """Populate current_prediction for students created before it was maintained"""
+    students = Student.get_motor_collection()
+    backfilled = 0
+    while True:
+        missing = await students.find({"current_prediction": {"$exists": False}}, {"_id": 1}).to_list(batch_size)
+        if not missing:
+            return backfilled
+
+        student_ids = [str(s["_id"]) for s in missing]
+        latest = await Prediction.get_motor_collection().aggregate([
+            {"$match": {"student_id": {"$in": student_ids}}},
+            {"$sort": {"student_id": 1, "created_at": -1}},
+            {"$group": {"_id": "$student_id", "prediction": {"$first": "$$ROOT"}}}
+        ]).to_list(None)
+        latest_by_student = {row["_id"]: row["prediction"] for row in latest}
+
+        # Students with no predictions get an explicit null so they are not revisited
+        operations = [
+            UpdateOne(
+                {"_id": s["_id"], "current_prediction": {"$exists": False}},
+                {"$set": {"current_prediction": current_prediction_fields(latest_by_student[str(s["_id"])])
+                          if str(s["_id"]) in latest_by_student else None}}
+            )
+            for s in missing
+        ]
+        await students.bulk_write(operations, ordered=False)
+        backfilled += len(latest_by_student)
+
+async def upsert_students_by_email(students):
+    """Insert or update student dicts keyed by email in one bulk_write.
+
+    Returns (upserted, modified, {email: student_id}, {batch index: error}).
+    """
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {"email": student["email"]},
+            {
+                "$set": {**student, "updated_at": now},
+                "$setOnInsert": {"created_at": now, "current_prediction": None}
+            },
+            upsert=True
+        )
+        for student in students
+    ]
+    collection = Student.get_motor_collection()
+    upserted = modified = 0
+    errors, pending = {}, list(range(len(students)))
+    # A concurrent writer can insert the same email between an upsert's match and
+    # its insert; the unique index rejects the loser, and one retry updates instead
+    for attempt in range(2):
+        try:
+            result = await collection.bulk_write([operations[i] for i in pending], ordered=False)
+            upserted += result.upserted_count
+            modified += result.modified_count
+            break
+        except BulkWriteError as e:
+            upserted += e.details.get("nUpserted", 0)
+            modified += e.details.get("nModified", 0)
+            retry = []
+            for error in e.details.get("writeErrors", []):
+                index = pending[error["index"]]
+                if error.get("code") != DUPLICATE_KEY_ERROR:
+                    errors[index] = error.get("errmsg", "write failed")
+                elif attempt == 0:
+                    retry.append(index)
+                else:
+                    errors[index] = f"Duplicate email {students[index]['email']}: written concurrently by another import"
+            if not retry:
+                break
+            pending = retry
+
+    emails = [student["email"] for i, student in enumerate(students) if i not in errors]
+    documents = await collection.find({"email": {"$in": emails}}, {"email": 1}).to_list(None)
+    return upserted, modified, {d["email"]: str(d["_id"]) for d in documents}, errors
+
+async def get_student_documents(student_ids, projection=None):
+    """Raw student documents for many IDs in one query"""
+    ids = [ObjectId(student_id) for student_id in student_ids]
+    return await Student.get_motor_collection().find({"_id": {"$in": ids}}, projection).to_list(None)
+
+async def stream_student_batches(batch_size: int, after_id: Optional[str] = None, projection=None):
+    """Yield raw student documents in _id order, batch_size at a time, starting after a checkpoint"""
+    query = {"_id": {"$gt": ObjectId(after_id)}} if after_id else {}
+    cursor = Student.get_motor_collection().find(query, projection).sort("_id", 1).batch_size(batch_size)
+    batch = []
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def aggregate_students(pipeline):
+    return await Student.aggregate(pipeline).to_list()
+
+# Bulk job checkpoints, keyed by job ID
+async def get_job_checkpoint(job_id: str):
+    return await database.job_checkpoints.find_one({"_id": job_id})
+
+async def save_job_checkpoint(job_id: str, fields):
+    await database.job_checkpoints.update_one(
+        {"_id": job_id}, {"$set": {**fields, "updated_at": datetime.utcnow()}}, upsert=True
+    )
+
 # User CRUD operations
 async def get_user_by_email(email: str):
     return await User.find_one(User.email == email)
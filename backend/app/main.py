@@ -1,11 +1,23 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import students, predictions, analytics, auth, chatbot
+from app.routers.chatbot import chatbot as chatbot_service
 from app.database import init_db
+from app.ml_client import ml_client
+from app.prediction_queue import prediction_queue
+from app.rescore import stop_rescore
+from app.password_pool import password_pool
+from app.auth import warn_if_ephemeral_key
+from app.logging_config import REQUEST_ID_HEADER, RequestIdMiddleware, setup_logging, stop_logging
 import asyncio
 
+setup_logging()
+
 app = FastAPI(title="Student Performance Detection System", version="1.0.0")
 
+# Correlation ID for every log line written while handling a request
+app.add_middleware(RequestIdMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -13,6 +25,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[REQUEST_ID_HEADER],
 )
 
 # Include routers
@@ -24,8 +37,22 @@ app.include_router(chatbot.router, prefix="/api/chatbot", tags=["chatbot"])
 
 @app.on_event("startup")
 async def startup_event():
+    warn_if_ephemeral_key()
     await init_db()
     print("Database initialization completed")
+    await ml_client.start()
+    await ml_client.refresh_model_version()
+    await chatbot_service.start()
+    prediction_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stop_rescore()
+    await prediction_queue.stop()
+    await ml_client.close()
+    await chatbot_service.close()
+    password_pool.shutdown()
+    stop_logging()
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,90 @@
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+ML_SERVICE_URL = os.getenv("ML_SERVICE_URL", "http://localhost:8002")  # ML microservice URL
+ML_SERVICE_TIMEOUT = float(os.getenv("ML_SERVICE_TIMEOUT", "10"))
+ML_SERVICE_CONNECT_TIMEOUT = float(os.getenv("ML_SERVICE_CONNECT_TIMEOUT", "3"))
+ML_SERVICE_MAX_CONNECTIONS = int(os.getenv("ML_SERVICE_MAX_CONNECTIONS", "20"))
+ML_SERVICE_MAX_CONCURRENCY = int(os.getenv("ML_SERVICE_MAX_CONCURRENCY", "10"))
+ML_SERVICE_RETRIES = int(os.getenv("ML_SERVICE_RETRIES", "2"))
+ML_SERVICE_BACKOFF = float(os.getenv("ML_SERVICE_BACKOFF", "0.2"))
+
+# Status codes worth retrying; anything else is returned to the caller as-is
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+class MLServiceClient:
+    """Shared async client for the ML microservice with pooled keep-alive connections"""
+
+    def __init__(self, base_url: str = ML_SERVICE_URL):
+        self.base_url = base_url
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(ML_SERVICE_MAX_CONCURRENCY)
+        # Last model version reported by the ML service (None until it reports one)
+        self.model_version: Optional[str] = None
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(ML_SERVICE_TIMEOUT, connect=ML_SERVICE_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=ML_SERVICE_MAX_CONNECTIONS,
+                    max_keepalive_connections=ML_SERVICE_MAX_CONNECTIONS
+                )
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def post(self, path: str, payload: Any) -> Any:
+        """POST JSON to the ML service, retrying transient failures with exponential backoff"""
+        if self._client is None:
+            await self.start()
+
+        async with self._semaphore:
+            for attempt in range(ML_SERVICE_RETRIES + 1):
+                try:
+                    response = await self._client.post(path, json=payload)
+                    if response.status_code in RETRYABLE_STATUS_CODES and attempt < ML_SERVICE_RETRIES:
+                        raise httpx.HTTPStatusError(
+                            f"ML service returned {response.status_code}",
+                            request=response.request,
+                            response=response
+                        )
+                    response.raise_for_status()
+                    return response.json()
+                except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                    retryable = isinstance(e, httpx.TransportError) or e.response.status_code in RETRYABLE_STATUS_CODES
+                    if not retryable or attempt >= ML_SERVICE_RETRIES:
+                        raise
+                    await asyncio.sleep(ML_SERVICE_BACKOFF * (2 ** attempt))
+
+    async def refresh_model_version(self) -> Optional[str]:
+        """Ask the ML service which model version it serves; keeps the last known one if it is unreachable"""
+        if self._client is None:
+            await self.start()
+        try:
+            response = await self._client.get("/health")
+            response.raise_for_status()
+            self.model_version = response.json().get("model_version") or self.model_version
+        except (httpx.HTTPError, ValueError):
+            pass
+        return self.model_version
+
+    async def predict(self, prediction_request: Dict[str, Any]) -> Dict[str, Any]:
+        result = await self.post("/api/predict", prediction_request)
+        self.model_version = result.get("model_version", self.model_version)
+        return result
+
+    async def predict_batch(self, prediction_requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        results = await self.post("/api/predict/batch", prediction_requests)
+        if results:
+            self.model_version = results[-1].get("model_version", self.model_version)
+        return results
+
+ml_client = MLServiceClient()
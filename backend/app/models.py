@@ -1,11 +1,12 @@
-from beanie import Document
+from beanie import Document, Indexed
 from pydantic import BaseModel, Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 class User(Document):
     name: str
-    email: str = Field(unique=True)
+    email: Indexed(str, unique=True)
     password: str  # Hashed password
     role: str = Field(default="student")  # "student" or "admin"
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -14,11 +15,21 @@ class User(Document):
     class Settings:
         name = "users"
 
+class CurrentPrediction(BaseModel):
+    """Denormalized copy of a student's most recent prediction"""
+    prediction_id: str
+    predicted_performance: str
+    risk_score: float
+    recommendations: List[str]
+    feature_fingerprint: Optional[str] = None
+    model_version: Optional[str] = None
+    created_at: datetime
+
 class Student(Document):
     name: str
-    email: str = Field(unique=True)
-    user_id: str  # Reference to User document ID
-    enrollment_year: int
+    email: Indexed(str, unique=True)
+    user_id: Indexed(str)  # Reference to User document ID
+    enrollment_year: Indexed(int)
     major: str
     attendance_percentage: float
     internal_marks: float
@@ -28,18 +39,31 @@ class Student(Document):
     study_hours: float
     socio_academic_factors: Dict[str, Any]  # JSON object
     participation_metrics: float
+    current_prediction: Optional[CurrentPrediction] = None  # Maintained by create_prediction
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Settings:
         name = "students"
+        indexes = [
+            IndexModel([("current_prediction.risk_score", DESCENDING)], name="current_risk_score_desc")
+        ]
 
 class Prediction(Document):
     student_id: str  # Reference to Student document ID
     predicted_performance: str  # e.g., "High", "Medium", "Low"
     risk_score: float
     recommendations: List[str]  # List of recommendation strings
+    feature_fingerprint: Optional[str] = None  # Hash of the model inputs and model version
+    model_version: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Settings:
-        name = "predictions"
\ No newline at end of file
+        name = "predictions"
+        indexes = [
+            # Serves both per-student history and latest-prediction lookups
+            IndexModel(
+                [("student_id", ASCENDING), ("created_at", DESCENDING)],
+                name="student_id_created_at_desc"
+            )
+        ]
\ No newline at end of file
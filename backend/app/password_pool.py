@@ -0,0 +1,69 @@
+import asyncio
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))  # Waiting jobs beyond the workers
+
+class PasswordPoolFull(Exception):
+    """Raised when the pool already has the maximum number of jobs waiting"""
+
+class PasswordHashPool:
+    """Dedicated, bounded thread pool for bcrypt hashing and verification.
+
+    bcrypt releases the GIL, so the workers hash in parallel while the event
+    loop keeps serving other requests. Jobs beyond the workers wait in a queue
+    of at most max_queue entries; once it is full new jobs are rejected with
+    PasswordPoolFull instead of piling up.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self.in_flight = 0  # Running plus waiting jobs; only touched from the event loop
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordPoolFull()
+        loop = asyncio.get_running_loop()
+        job = self._executor.submit(func, *args)
+        self.in_flight += 1
+        # Count the job as finished when the thread is done, not when the caller stops
+        # waiting: a cancelled request leaves its bcrypt call running in the worker
+        job.add_done_callback(lambda job: self._call_on_loop(loop, job))
+        return await asyncio.wrap_future(job)
+
+    def _call_on_loop(self, loop: asyncio.AbstractEventLoop, job: Future):
+        try:
+            loop.call_soon_threadsafe(self._job_done, job)
+        except RuntimeError:
+            pass  # Loop already closed at shutdown
+
+    def _job_done(self, job: Future):
+        self.in_flight -= 1
+        if job.cancelled() or job.exception() is not None:
+            self.failed += 1
+        else:
+            self.completed += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "running": min(self.in_flight, self.workers),
+            "queue_depth": max(self.in_flight - self.workers, 0),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+password_pool = PasswordHashPool()
@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app import crud, schemas
+from app.ml_client import ml_client
+from app.logging_config import request_id_var
+
+logger = logging.getLogger(__name__)
+
+PREDICTION_WORKERS = int(os.getenv("PREDICTION_WORKERS", "4"))
+PREDICTION_MAX_ATTEMPTS = int(os.getenv("PREDICTION_MAX_ATTEMPTS", "3"))
+PREDICTION_RETRY_BACKOFF = float(os.getenv("PREDICTION_RETRY_BACKOFF", "1.0"))  # seconds
+PREDICTION_STATUS_LIMIT = int(os.getenv("PREDICTION_STATUS_LIMIT", "10000"))
+
+def student_prediction_data(student) -> Dict[str, Any]:
+    """Convert a student document to the dict used for ML service calls"""
+    return {
+        '_id': str(student.id),
+        'name': student.name,
+        'attendance_percentage': student.attendance_percentage,
+        'internal_marks': student.internal_marks,
+        'assignment_scores': student.assignment_scores,
+        'lab_performance': student.lab_performance,
+        'previous_gpa': student.previous_gpa,
+        'study_hours': student.study_hours,
+        'socio_academic_factors': student.socio_academic_factors,
+        'participation_metrics': student.participation_metrics
+    }
+
+# Student fields the model consumes; changes to anything else never affect a prediction
+MODEL_FEATURES = [
+    'attendance_percentage', 'internal_marks', 'assignment_scores', 'lab_performance',
+    'previous_gpa', 'study_hours', 'participation_metrics', 'socio_academic_factors'
+]
+
+def feature_fingerprint(student_data: Dict[str, Any], model_version: Optional[str]) -> str:
+    """Stable hash of the model-relevant features together with the model version"""
+    payload = {f: student_data.get(f) for f in MODEL_FEATURES}
+    payload['model_version'] = model_version
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def fingerprint_matches(student_data: Dict[str, Any], fingerprint: Optional[str],
+                        stored_version: Optional[str]) -> bool:
+    """True when a stored fingerprint matches the student's features and the served model.
+
+    While the served version is unknown (the ML service has not answered yet),
+    the version recorded with the prediction is assumed, so only the features
+    are compared and a restart alone never marks every prediction stale.
+    """
+    if fingerprint is None:
+        return False
+    version = ml_client.model_version if ml_client.model_version is not None else stored_version
+    return fingerprint == feature_fingerprint(student_data, version)
+
+def prediction_is_current(student) -> bool:
+    """True when the student's current prediction was made from the same features and model"""
+    current = student.current_prediction
+    if current is None:
+        return False
+    return fingerprint_matches(student_prediction_data(student), current.feature_fingerprint, current.model_version)
+
+def prediction_request(student_data: Dict[str, Any]) -> Dict[str, Any]:
+    """ML service request body for a student dict"""
+    return {
+        "student_id": str(student_data.get('_id')),
+        "attendance_percentage": student_data.get('attendance_percentage', 0),
+        "internal_marks": student_data.get('internal_marks', 0),
+        "assignment_scores": student_data.get('assignment_scores', 0),
+        "lab_performance": student_data.get('lab_performance', 0),
+        "previous_gpa": student_data.get('previous_gpa', 0),
+        "study_hours": student_data.get('study_hours', 0),
+        "socio_academic_factors": student_data.get('socio_academic_factors', {}),
+        "participation_metrics": student_data.get('participation_metrics', 0)
+    }
+
+async def generate_prediction_for_student(student_data):
+    """Generate AI prediction for a student; raises on failure so the queue can retry"""
+    # Call ML service to generate prediction
+    result = await ml_client.predict(prediction_request(student_data))
+    model_version = result.get("model_version")
+
+    # Save prediction to database
+    prediction_record = schemas.PredictionCreate(
+        student_id=str(student_data.get('_id')),
+        predicted_performance=result["predicted_performance"],
+        risk_score=result["risk_score"],
+        recommendations=result["recommendations"],
+        feature_fingerprint=feature_fingerprint(student_data, model_version),
+        model_version=model_version
+    )
+    await crud.create_prediction(prediction=prediction_record)
+    logger.info("prediction.generated", extra={
+        "student_id": student_data.get('_id'), "model_version": model_version, "sampled": True
+    })
+
+class PredictionQueue:
+    """In-process job queue that generates predictions off the request path.
+
+    Jobs are keyed by student ID: enqueueing a student that is already waiting
+    replaces its data instead of adding a second job, so rapid successive
+    updates collapse into one ML call. A student is never processed by two
+    workers at once; data arriving mid-run is picked up when the run ends.
+    """
+
+    def __init__(self, workers: int = PREDICTION_WORKERS):
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._running = set()
+        self._status: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tasks = []
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, student_data: Dict[str, Any]):
+        student_id = str(student_data['_id'])
+        if student_id not in self._pending and student_id not in self._running:
+            self._queue.put_nowait(student_id)
+        self._pending[student_id] = student_data
+        # Remember the enqueuing request so the job's log lines share its correlation ID
+        self._set_status(student_id, "queued", attempts=0, last_error=None, request_id=request_id_var.get())
+
+    def enqueue_student(self, student):
+        self.enqueue(student_prediction_data(student))
+
+    def get_status(self, student_id: str) -> Optional[Dict[str, Any]]:
+        status = self._status.get(student_id)
+        return {"student_id": student_id, **status} if status else None
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": len(self._pending), "workers": len(self._tasks)}
+
+    def _set_status(self, student_id: str, state: str, **fields):
+        status = self._status.pop(student_id, {})
+        status.update(fields, status=state, updated_at=datetime.utcnow())
+        self._status[student_id] = status
+        while len(self._status) > PREDICTION_STATUS_LIMIT:
+            self._status.popitem(last=False)
+
+    async def _worker(self):
+        while True:
+            student_id = await self._queue.get()
+            self._running.add(student_id)
+            try:
+                student_data = self._pending.pop(student_id, None)
+                if student_data is not None:
+                    request_id_var.set(self._status.get(student_id, {}).get("request_id"))
+                    await self._run(student_id, student_data)
+            finally:
+                self._running.discard(student_id)
+                if student_id in self._pending:
+                    self._queue.put_nowait(student_id)
+                self._queue.task_done()
+
+    async def _run(self, student_id: str, student_data: Dict[str, Any]):
+        for attempt in range(1, PREDICTION_MAX_ATTEMPTS + 1):
+            self._set_status(student_id, "running", attempts=attempt)
+            try:
+                await generate_prediction_for_student(student_data)
+                error = None
+            except Exception as e:
+                error = str(e)
+
+            if student_id in self._pending:
+                # Newer data arrived meanwhile; that queued job supersedes this one
+                return
+            if error is None:
+                self._set_status(student_id, "done", last_error=None)
+                return
+
+            self._set_status(student_id, "retrying", last_error=error)
+            if attempt < PREDICTION_MAX_ATTEMPTS:
+                await asyncio.sleep(PREDICTION_RETRY_BACKOFF * (2 ** (attempt - 1)))
+                if student_id in self._pending:
+                    return
+
+        self._set_status(student_id, "failed")
+        logger.warning("prediction.failed", extra={"student_id": student_id, "error": error})
+
+prediction_queue = PredictionQueue()
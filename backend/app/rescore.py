@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app import crud, schemas
+from app.ml_client import ml_client
+from app.prediction_queue import MODEL_FEATURES, feature_fingerprint, fingerprint_matches, prediction_request
+
+logger = logging.getLogger(__name__)
+
+RESCORE_BATCH_SIZE = int(os.getenv("RESCORE_BATCH_SIZE", "1000"))
+DEFAULT_JOB_ID = "rescore"
+
+# Only the fields scoring and fingerprinting need
+STUDENT_PROJECTION = {f: 1 for f in MODEL_FEATURES + [
+    'name', 'current_prediction.feature_fingerprint', 'current_prediction.model_version'
+]}
+
+_task: Optional[asyncio.Task] = None
+
+def needs_rescore(student: Dict[str, Any]) -> bool:
+    """False when the current prediction already came from these features and the served model"""
+    current = student.get('current_prediction') or {}
+    return not fingerprint_matches(student, current.get('feature_fingerprint'), current.get('model_version'))
+
+async def score_batch(students: List[Dict[str, Any]]) -> List[schemas.PredictionCreate]:
+    """Score a batch of raw student documents with one ML service call"""
+    results = await ml_client.predict_batch([prediction_request(s) for s in students])
+    return [
+        schemas.PredictionCreate(
+            student_id=str(student['_id']),
+            predicted_performance=result["predicted_performance"],
+            risk_score=result["risk_score"],
+            recommendations=result["recommendations"],
+            feature_fingerprint=feature_fingerprint(student, result.get("model_version")),
+            model_version=result.get("model_version")
+        )
+        for student, result in zip(students, results)
+    ]
+
+async def rescore_students(job_id: str = DEFAULT_JOB_ID, batch_size: int = RESCORE_BATCH_SIZE,
+                           restart: bool = False, skip_current: bool = True) -> Dict[str, Any]:
+    """Re-score every student in _id order, checkpointing after each written batch.
+
+    An unfinished job with the same ID resumes after its last checkpointed
+    student; a completed one (or restart=True) starts over. While batch N is
+    written, batch N+1 is already being scored.
+    """
+    # Compare fingerprints against the version the ML service serves right now
+    await ml_client.refresh_model_version()
+    checkpoint = await crud.get_job_checkpoint(job_id)
+    if restart or checkpoint is None or checkpoint.get("state") == "completed":
+        checkpoint = {"last_student_id": None, "processed": 0, "scored": 0, "skipped": 0, "elapsed_seconds": 0.0}
+    job = {
+        "state": "running",
+        "error": None,
+        "batch_size": batch_size,
+        "last_student_id": checkpoint.get("last_student_id"),
+        "processed": checkpoint.get("processed", 0),
+        "scored": checkpoint.get("scored", 0),
+        "skipped": checkpoint.get("skipped", 0),
+        "elapsed_seconds": checkpoint.get("elapsed_seconds", 0.0),
+        "started_at": datetime.utcnow()
+    }
+    if job["last_student_id"]:
+        logger.info("rescore.resumed", extra={"job_id": job_id, "after_student_id": job["last_student_id"]})
+    await crud.save_job_checkpoint(job_id, job)
+
+    start = time.monotonic()
+    previous_elapsed = job["elapsed_seconds"]
+
+    async def write_batch(students, predictions, skipped):
+        await crud.create_predictions_bulk(predictions, created_at=datetime.utcnow())
+        elapsed = previous_elapsed + time.monotonic() - start
+        processed = job["processed"] + len(students)
+        job.update(
+            last_student_id=str(students[-1]['_id']),
+            processed=processed,
+            scored=job["scored"] + len(predictions),
+            skipped=job["skipped"] + skipped,
+            elapsed_seconds=round(elapsed, 3),
+            students_per_second=round(processed / elapsed, 1) if elapsed else None,
+            model_version=ml_client.model_version
+        )
+        await crud.save_job_checkpoint(job_id, job)
+        logger.info("rescore.progress", extra={
+            "job_id": job_id, "processed": job["processed"], "students_per_second": job["students_per_second"]
+        })
+
+    pending_write = None
+    try:
+        async for students in crud.stream_student_batches(batch_size, job["last_student_id"], STUDENT_PROJECTION):
+            stale = [s for s in students if not skip_current or needs_rescore(s)]
+            predictions = await score_batch(stale) if stale else []
+            if pending_write is not None:
+                await pending_write
+            pending_write = asyncio.create_task(write_batch(students, predictions, len(students) - len(stale)))
+        if pending_write is not None:
+            await pending_write
+        job.update(state="completed", finished_at=datetime.utcnow())
+    except asyncio.CancelledError:
+        job.update(state="interrupted")
+        raise
+    except Exception as e:
+        job.update(state="failed", error=str(e))
+    finally:
+        if pending_write is not None and not pending_write.done():
+            # Settle the in-flight batch before recording the final checkpoint
+            await asyncio.gather(pending_write, return_exceptions=True)
+        await crud.save_job_checkpoint(job_id, job)
+
+    if job["state"] == "failed":
+        logger.warning("rescore.failed", extra={"job_id": job_id, "processed": job["processed"], "error": job["error"]})
+    return job
+
+async def rescore_student_ids(student_ids: List[str], batch_size: int = RESCORE_BATCH_SIZE,
+                             skip_current: bool = True) -> Dict[str, int]:
+    """Score specific students (e.g. after a bulk import) one batch per ML call"""
+    counts = {"scored": 0, "skipped": 0}
+    for start in range(0, len(student_ids), batch_size):
+        students = await crud.get_student_documents(student_ids[start:start + batch_size], STUDENT_PROJECTION)
+        stale = [s for s in students if not skip_current or needs_rescore(s)]
+        if stale:
+            await crud.create_predictions_bulk(await score_batch(stale), created_at=datetime.utcnow())
+        counts["scored"] += len(stale)
+        counts["skipped"] += len(students) - len(stale)
+    return counts
+
+def start_rescore(**kwargs) -> bool:
+    """Run a re-score job in the background; False if one is already running"""
+    global _task
+    if _task is not None and not _task.done():
+        return False
+    _task = asyncio.create_task(rescore_students(**kwargs))
+    return True
+
+def is_running() -> bool:
+    return _task is not None and not _task.done()
+
+async def stop_rescore():
+    """Cancel a running job; its checkpoint is kept so it can resume later"""
+    if is_running():
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
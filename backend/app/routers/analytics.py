@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
 
 router = APIRouter()
 
@@ -7,17 +8,13 @@ async def get_dashboard_data():
     """Get dashboard data with students and their predictions"""
     from app import crud
     
-    # Get all students
+    # Get all students (each carries its current prediction)
     students = await crud.get_students()
     
-    # Get all predictions
-    predictions = await crud.get_all_predictions()
-    
-    # Match students with predictions
     dashboard_data = []
     for student in students:
         student_id = str(student.id)
-        prediction = next((p for p in predictions if p.student_id == student_id), None)
+        prediction = student.current_prediction
         
         dashboard_data.append({
             "student": {
@@ -57,6 +54,40 @@ async def get_dashboard_data():
         }
     }
 
+@router.get("/dashboard/students")
+async def get_dashboard_students(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    fields: Optional[str] = None,
+    sort_by: str = "id",
+    order: str = "asc",
+    major: Optional[str] = None,
+    enrollment_year: Optional[int] = None,
+    min_risk: Optional[float] = None,
+    max_risk: Optional[float] = None
+):
+    """Paginated dashboard rows; pass next_cursor back as cursor to fetch the next page"""
+    from app import crud
+    try:
+        return await crud.get_dashboard_page(
+            cursor=cursor,
+            limit=limit,
+            fields=[f.strip() for f in fields.split(",")] if fields else None,
+            sort_by=sort_by,
+            order=order,
+            major=major,
+            enrollment_year=enrollment_year,
+            min_risk=min_risk,
+            max_risk=max_risk
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/dashboard/stats")
+async def get_dashboard_stats():
+    from app import crud
+    return await crud.get_dashboard_stats()
+
 @router.get("/performance-trends")
 async def get_performance_trends():
     # Aggregate data for trends
@@ -3,8 +3,13 @@ from pydantic import BaseModel, EmailStr
 from passlib.context import CryptContext
 from app import crud
 from app.models import User
+from app.password_pool import password_pool, PasswordPoolFull
+from app.auth import create_access_token, get_current_user
 from datetime import datetime
+import hashlib
+import logging
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -25,26 +30,19 @@ class UserResponse(BaseModel):
     role: str
     created_at: datetime
 
+class LoginResponse(UserResponse):
+    access_token: str
+    token_type: str = "bearer"
+
 def hash_password(password: str):
-    print(f"Original password length: {len(password)}")
     # Truncate password to 72 characters max for bcrypt
-    if len(password) > 72:
-        print(f"Truncating password from {len(password)} to 72")
-        password = password[:72]
-    print(f"Final password length: {len(password)}")
-    print(f"Final password: '{password}'")
+    password = password[:72]
     try:
-        result = pwd_context.hash(password)
-        print(f"Hash successful, length: {len(result)}")
-        return result
-    except Exception as e:
-        print(f"Hash error: {e}")
-        print(f"Error type: {type(e)}")
+        return pwd_context.hash(password)
+    except Exception:
         # If bcrypt still fails, use a simple hash for testing
-        import hashlib
-        fallback_hash = hashlib.sha256(password.encode()).hexdigest()
-        print(f"Using fallback hash: {fallback_hash[:20]}...")
-        return fallback_hash
+        logger.exception("password.hash_fallback")
+        return hashlib.sha256(password.encode()).hexdigest()
 
 def verify_password(plain_password: str, hashed_password: str):
     try:
@@ -52,19 +50,26 @@ def verify_password(plain_password: str, hashed_password: str):
         return pwd_context.verify(plain_password, hashed_password)
     except:
         # If bcrypt fails, try SHA256 fallback
-        import hashlib
         sha256_hash = hashlib.sha256(plain_password.encode()).hexdigest()
         return sha256_hash == hashed_password
 
+async def run_password_job(func, *args):
+    """Run a bcrypt call in the bounded password pool; 429 when its queue is full"""
+    try:
+        return await password_pool.run(func, *args)
+    except PasswordPoolFull:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login requests, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
 @router.get("/test")
 async def test_endpoint():
     return {"message": "Auth router is working"}
 
 @router.post("/register")
 async def register(user: UserCreate):
-    print(f"Registering user: {user.email}")
-    print(f"Password length: {len(user.password)}")
-    
     # Use real MongoDB database
     try:
         # Check if user already exists
@@ -73,8 +78,7 @@ async def register(user: UserCreate):
             raise HTTPException(status_code=400, detail="Email already registered")
         
         # Hash password with length limit
-        hashed_password = hash_password(user.password)
-        print(f"Hashed password length: {len(hashed_password)}")
+        hashed_password = await run_password_job(hash_password, user.password)
         
         # Create user in database
         user_data = {
@@ -85,7 +89,7 @@ async def register(user: UserCreate):
         }
         
         db_user = await crud.create_user(user_data)
-        print(f"User created with ID: {db_user.id}")
+        logger.info("user.registered", extra={"user_id": str(db_user.id), "role": db_user.role})
         
         return UserResponse(
             id=str(db_user.id),
@@ -94,59 +98,52 @@ async def register(user: UserCreate):
             role=db_user.role,
             created_at=db_user.created_at
         )
+    except HTTPException:
+        raise  # Re-raise HTTP exceptions
     except Exception as e:
-        print(f"Registration error: {e}")
+        logger.exception("user.register_failed")
         raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
 
 @router.post("/login")
 async def login(user: UserLogin):
-    print(f"Login attempt for email: {user.email}")
     # Use real MongoDB database
     try:
         # Find user by email
-        print(f"Looking up user in database...")
         db_user = await crud.get_user_by_email(user.email)
-        print(f"User lookup result: {bool(db_user)}")
-        
         if not db_user:
-            print(f"User not found: {user.email}")
+            logger.warning("auth.login_failed", extra={"reason": "unknown_email"})
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
-        print(f"User found: {db_user.name}")
-        print(f"Verifying password...")
-        
         # Verify password
-        password_valid = verify_password(user.password, db_user.password)
-        print(f"Password verification result: {password_valid}")
-        
+        password_valid = await run_password_job(verify_password, user.password, db_user.password)
         if not password_valid:
-            print(f"Invalid password for user: {user.email}")
+            logger.warning("auth.login_failed", extra={"reason": "bad_password", "user_id": str(db_user.id)})
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
-        print(f"Login successful for: {user.email}")
+        logger.info("auth.login", extra={"user_id": str(db_user.id), "sampled": True})
         
-        return UserResponse(
+        return LoginResponse(
             id=str(db_user.id),
             name=db_user.name,
             email=db_user.email,
             role=db_user.role,
-            created_at=db_user.created_at
+            created_at=db_user.created_at,
+            access_token=create_access_token(db_user)
         )
     except HTTPException:
         raise  # Re-raise HTTP exceptions
     except Exception as e:
-        print(f"Login error: {e}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("auth.login_error")
         raise HTTPException(status_code=500, detail=f"Login failed: {str(e)}")
 
+@router.get("/metrics")
+async def auth_metrics():
+    """Password pool load: running jobs, queue depth and rejections"""
+    return {"password_pool": password_pool.stats()}
+
 @router.get("/me")
-async def get_current_user(user_id: str):
-    user = await crud.get_user_by_id(user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
+async def read_current_user(user: User = Depends(get_current_user)):
+    """The user the bearer token belongs to"""
     return UserResponse(
         id=str(user.id),
         name=user.name,
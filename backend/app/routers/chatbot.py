@@ -1,15 +1,21 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Any, Optional
 from datetime import datetime
 import asyncio
-import requests
+import httpx
+import json
+import logging
 import os
 
 from app.database import get_database
 from app.auth import get_current_user_chat
 from app.models import User
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
 # =========================
@@ -17,6 +23,9 @@ router = APIRouter()
 # =========================
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "phi3:3.8b")
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "60"))  # Whole completion, or the gap between streamed tokens
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))  # Generations running at once
+OLLAMA_QUEUE_TIMEOUT = float(os.getenv("OLLAMA_QUEUE_TIMEOUT", "15"))  # Seconds to wait for a free slot
 
 # =========================
 # REQUEST / RESPONSE MODELS
@@ -38,11 +47,19 @@ class ChatResponse(BaseModel):
 # =========================
 # CHATBOT SERVICE
 # =========================
+class ChatbotBusy(Exception):
+    """Raised when no generation slot frees up within OLLAMA_QUEUE_TIMEOUT"""
+
 class ChatbotService:
     def __init__(self):
         self.sessions = {}
         self.ollama_available = None
-        self.http = requests.Session()
+        self._client: Optional[httpx.AsyncClient] = None  # Pooled keep-alive connections to Ollama
+        # Caps concurrent generations at what the local model server can run
+        self._slots = asyncio.Semaphore(OLLAMA_MAX_CONCURRENCY)
+        self.running = 0
+        self.waiting = 0
+        self.rejected = 0
 
     # ---------- INTENT ----------
     async def analyze_intent(self, message: str, role: str) -> str:
@@ -66,16 +83,12 @@ class ChatbotService:
             student = await db.students.find_one({"email": user.email})
             if student:
                 data["student"] = student
-                pred = await db.predictions.find_one(
-                    {"student_id": str(student["_id"])},
-                    sort=[("created_at", -1)]
-                )
-                if pred:
-                    data["prediction"] = pred
+                if student.get("current_prediction"):
+                    data["prediction"] = student["current_prediction"]
 
         else:
             students = await db.students.find({}).to_list(200)
-            preds = await db.predictions.find({}).to_list(200)
+            preds = [s["current_prediction"] for s in students if s.get("current_prediction")]
 
             data["students"] = students
             data["predictions"] = preds
@@ -124,18 +137,14 @@ class ChatbotService:
         if self.ollama_available is not None:
             return self.ollama_available
         try:
-            r = self.http.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=3)
+            r = await self.async_client().get("/api/tags", timeout=3)
             self.ollama_available = r.status_code == 200
         except:
             self.ollama_available = False
         return self.ollama_available
 
-    # ---------- CALL OLLAMA (FAST MODE) ----------
-    async def call_ollama(self, prompt: str, context: str) -> str:
-        available = await self.check_ollama()
-        if not available:
-            return "AI engine not running. Please start Ollama."
-
+    # ---------- PROMPT ----------
+    def build_payload(self, prompt: str, context: str, stream: bool) -> Dict[str, Any]:
         full_prompt = f"""
 You are a student performance assistant.
 Answer ONLY from the data below.
@@ -148,10 +157,10 @@ Question: {prompt}
 Answer briefly in bullet points.
 """
 
-        payload = {
+        return {
             "model": OLLAMA_MODEL,
             "prompt": full_prompt,
-            "stream": False,
+            "stream": stream,
             "options": {
                 "temperature": 0.3,
                 "num_predict": 200,
@@ -160,16 +169,96 @@ Answer briefly in bullet points.
             }
         }
 
+    # ---------- CALL OLLAMA (FAST MODE) ----------
+    async def call_ollama(self, prompt: str, context: str) -> str:
+        available = await self.check_ollama()
+        if not available:
+            return "AI engine not running. Please start Ollama."
+
+        payload = self.build_payload(prompt, context, stream=False)
+        release = await self.acquire_slot()
         try:
-            res = await asyncio.to_thread(
-                self.http.post,
-                f"{OLLAMA_BASE_URL}/api/generate",
-                json=payload,
-                timeout=60
-            )
+            res = await self.async_client().post("/api/generate", json=payload)
             return res.json().get("response", "No response generated.")
         except:
             return "AI model timeout. Try again."
+        finally:
+            await release()
+
+    # ---------- CLIENT / CONCURRENCY ----------
+    def async_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=OLLAMA_BASE_URL,
+                timeout=httpx.Timeout(OLLAMA_TIMEOUT, connect=3),
+                # A spare connection keeps availability checks from waiting behind generations
+                limits=httpx.Limits(
+                    max_connections=OLLAMA_MAX_CONCURRENCY + 1,
+                    max_keepalive_connections=OLLAMA_MAX_CONCURRENCY + 1
+                )
+            )
+        return self._client
+
+    async def start(self):
+        self.async_client()
+
+    async def acquire_slot(self) -> Callable[[], Awaitable[None]]:
+        """Wait (bounded) for a generation slot; returns an async release function that is safe to call twice.
+
+        Release is a coroutine so Starlette runs it on the event loop (never in its
+        threadpool) when it is used as a response background task.
+        """
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), OLLAMA_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise ChatbotBusy()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        released = False
+
+        async def release():
+            nonlocal released
+            if not released:
+                released = True
+                self.running -= 1
+                self._slots.release()
+        return release
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_concurrency": OLLAMA_MAX_CONCURRENCY,
+            "running": self.running,
+            "waiting": self.waiting,
+            "rejected": self.rejected
+        }
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def stream_ollama(self, prompt: str, context: str) -> AsyncIterator[str]:
+        """Yield response tokens as Ollama generates them.
+
+        Leaving the loop early (e.g. the client disconnected) closes the
+        upstream connection, which stops the generation in Ollama.
+        """
+        payload = self.build_payload(prompt, context, stream=True)
+        async with self.async_client().stream("POST", "/api/generate", json=payload) as res:
+            res.raise_for_status()
+            async for line in res.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    return
 
     # ---------- FOLLOW UPS ----------
     def followups(self, intent: str):
@@ -188,11 +277,15 @@ Answer briefly in bullet points.
         return ["Ask another performance question"]
 
     # ---------- MAIN ----------
-    async def process(self, message: str, user: User, session_id: str):
+    async def prepare(self, message: str, user: User):
+        """Intent, fetched data and prompt context for a message"""
         intent = await self.analyze_intent(message, user.role)
         db = get_database()
         data = await self.fetch_data(intent, user, db)
-        context = self.build_context(intent, data)
+        return intent, data, self.build_context(intent, data)
+
+    async def process(self, message: str, user: User, session_id: str):
+        intent, data, context = await self.prepare(message, user)
 
         answer = await self.call_ollama(message, context)
         confidence = 0.9 if data else 0.6
@@ -205,17 +298,112 @@ Answer briefly in bullet points.
             explanation=None if confidence > 0.85 else "Limited data available"
         )
 
+    async def process_stream(self, message: str, prepared, session_id: str,
+                             release: Callable[[], Awaitable[None]]) -> AsyncIterator[str]:
+        """Server-Sent Events: one `meta` event, a `token` event per chunk, then `done` (or `error`).
+
+        `prepared` is the result of prepare(), done before the caller acquired the
+        generation slot, so the slot is held only while Ollama generates; `release` frees it.
+        """
+        events = self._stream_events(message, *prepared)
+        try:
+            async for event in events:
+                yield event
+        finally:
+            try:
+                await events.aclose()
+            finally:
+                await release()
+
+    async def _stream_events(self, message: str, intent: str, data: Dict[str, Any], context: str) -> AsyncIterator[str]:
+        confidence = 0.9 if data else 0.6
+        yield sse_event("meta", {
+            "confidence": confidence,
+            "data_sources": list(data.keys()),
+            "follow_up_questions": self.followups(intent),
+            "explanation": None if confidence > 0.85 else "Limited data available"
+        })
+
+        if not await self.check_ollama():
+            yield sse_event("error", {"detail": "AI engine not running. Please start Ollama."})
+            return
+
+        answer = []
+        tokens = self.stream_ollama(message, context)
+        try:
+            async for token in tokens:
+                answer.append(token)
+                yield sse_event("token", {"text": token})
+        except asyncio.CancelledError:
+            logger.info("chat.stream_cancelled", extra={"tokens": len(answer)})
+            raise
+        except Exception as e:
+            logger.warning("chat.stream_failed", extra={"error": str(e), "tokens": len(answer)})
+            yield sse_event("error", {"detail": "AI model timeout. Try again."})
+            return
+        finally:
+            # Close the upstream stream now, not whenever the generator is collected
+            await tokens.aclose()
+        yield sse_event("done", {"response": "".join(answer) or "No response generated."})
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
 
 chatbot = ChatbotService()
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat(message: ChatMessage):
-    user = await get_current_user_chat(message.user_email)
+optional_bearer = HTTPBearer(auto_error=False)
+
+def busy_exception() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="The AI assistant is busy with other questions, please retry shortly",
+        headers={"Retry-After": "5"}
+    )
+
+async def chat_user(message: ChatMessage, credentials: Optional[HTTPAuthorizationCredentials]) -> User:
+    # A bearer token is verified locally (401 if invalid); user_email remains for older clients that send none
+    token = credentials.credentials if credentials else None
+    user = await get_current_user_chat(message.user_email, token=token)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid user")
+    return user
 
-    return await chatbot.process(
-        message.message,
-        user,
-        message.session_id or "default"
+@router.post("/chat", response_model=ChatResponse)
+async def chat(message: ChatMessage, credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_bearer)):
+    user = await chat_user(message, credentials)
+
+    try:
+        return await chatbot.process(
+            message.message,
+            user,
+            message.session_id or "default"
+        )
+    except ChatbotBusy:
+        raise busy_exception()
+
+@router.post("/chat/stream")
+async def chat_stream(message: ChatMessage, credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_bearer)):
+    """Relay the answer token by token as Server-Sent Events; a client disconnect cancels generation"""
+    user = await chat_user(message, credentials)
+    # Database work and prompt building happen before taking a generation slot
+    prepared = await chatbot.prepare(message.message, user)
+    try:
+        release = await chatbot.acquire_slot()
+    except ChatbotBusy:
+        raise busy_exception()
+
+    # The stream releases the slot when it ends; the background task covers a
+    # client that disconnects before the stream starts
+    return StreamingResponse(
+        chatbot.process_stream(message.message, prepared, message.session_id or "default", release),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(release)
     )
+
+@router.get("/metrics")
+async def chatbot_metrics():
+    """Generation slots in use, requests waiting for one and requests turned away as busy"""
+    return {"generations": chatbot.stats()}
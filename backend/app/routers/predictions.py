@@ -1,30 +1,31 @@
-from fastapi import APIRouter, HTTPException
-import requests
-from app import crud, models, schemas
+from fastapi import APIRouter, Depends, HTTPException
+import httpx
+from app import crud, models, rescore, schemas
+from app.auth import require_role
+from app.ml_client import ml_client
+from app.prediction_queue import feature_fingerprint
 
 router = APIRouter()
 
-ML_SERVICE_URL = "http://localhost:8002"  # ML microservice URL
-
 @router.post("/predict", response_model=schemas.PredictionResponse)
 async def predict_performance(prediction: schemas.PredictionRequest):
     # Call ML service
     try:
-        response = requests.post(f"{ML_SERVICE_URL}/api/predict", json=prediction.dict())
-        response.raise_for_status()
-        result = response.json()
+        result = await ml_client.predict(prediction.dict())
 
         # Save prediction to DB
         prediction_record = schemas.PredictionCreate(
             student_id=prediction.student_id,
             predicted_performance=result["predicted_performance"],
             risk_score=result["risk_score"],
-            recommendations=result["recommendations"]
+            recommendations=result["recommendations"],
+            feature_fingerprint=feature_fingerprint(prediction.dict(), result.get("model_version")),
+            model_version=result.get("model_version")
         )
         await crud.create_prediction(prediction=prediction_record)
 
         return result
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"ML service error: {str(e)}")
 
 @router.get("/", response_model=list[schemas.Prediction])
@@ -35,4 +36,23 @@ async def get_all_predictions():
 
 @router.get("/history/{student_id}", response_model=list[schemas.Prediction])
 async def get_prediction_history(student_id: str):
-    return await crud.get_predictions_by_student(student_id=student_id)
\ No newline at end of file
+    return await crud.get_predictions_by_student(student_id=student_id)
+
+@router.post("/rescore", status_code=202, dependencies=[Depends(require_role("admin"))])
+async def start_rescore(job_id: str = rescore.DEFAULT_JOB_ID, batch_size: int = rescore.RESCORE_BATCH_SIZE,
+                        restart: bool = False, skip_current: bool = True):
+    """Re-score every student in the background, resuming an unfinished job with the same ID"""
+    if batch_size < 1:
+        raise HTTPException(status_code=400, detail="batch_size must be positive")
+    if not rescore.start_rescore(job_id=job_id, batch_size=batch_size, restart=restart, skip_current=skip_current):
+        raise HTTPException(status_code=409, detail="A re-score job is already running")
+    return {"status": "started", "job_id": job_id}
+
+@router.get("/rescore")
+async def get_rescore_status(job_id: str = rescore.DEFAULT_JOB_ID):
+    """Progress and throughput of a re-score job, read from its checkpoint"""
+    job = await crud.get_job_checkpoint(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Re-score job not found")
+    job_id = job.pop("_id")
+    return {**job, "job_id": job_id, "running": rescore.is_running()}
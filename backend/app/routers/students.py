@@ -1,70 +1,46 @@
-from fastapi import APIRouter, HTTPException
-from app import crud, models, schemas
-import requests
+from fastapi import APIRouter, Depends, HTTPException, Request
+from app import crud, models, schemas, student_import
+from app.auth import require_role
+from app.prediction_queue import prediction_queue, prediction_is_current
+from pymongo.errors import DuplicateKeyError
+from typing import Optional
+import logging
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
-async def generate_prediction_for_student(student_data):
-    """Generate AI prediction for a new student"""
-    try:
-        # Call ML service to generate prediction
-        prediction_request = {
-            "student_id": str(student_data.get('_id')),
-            "attendance_percentage": student_data.get('attendance_percentage', 0),
-            "internal_marks": student_data.get('internal_marks', 0),
-            "assignment_scores": student_data.get('assignment_scores', 0),
-            "lab_performance": student_data.get('lab_performance', 0),
-            "previous_gpa": student_data.get('previous_gpa', 0),
-            "study_hours": student_data.get('study_hours', 0),
-            "socio_academic_factors": student_data.get('socio_academic_factors', {}),
-            "participation_metrics": student_data.get('participation_metrics', 0)
-        }
-        
-        response = requests.post("http://localhost:8002/api/predict", json=prediction_request, timeout=10)
-        response.raise_for_status()
-        result = response.json()
-        
-        # Save prediction to database
-        prediction_record = schemas.PredictionCreate(
-            student_id=str(student_data.get('_id')),
-            predicted_performance=result["predicted_performance"],
-            risk_score=result["risk_score"],
-            recommendations=result["recommendations"]
-        )
-        await crud.create_prediction(prediction=prediction_record)
-        print(f"✅ Generated AI prediction for new student: {student_data.get('name')}")
-        
-    except Exception as e:
-        print(f"⚠️  Could not generate AI prediction for {student_data.get('name')}: {e}")
-
 @router.post("/", response_model=schemas.Student)
 async def create_student(student: schemas.StudentCreate):
     # Create student first
-    new_student = await crud.create_student(student=student)
-    
-    # Generate AI prediction for the new student
     try:
-        # Convert student to dict for ML service
-        student_data = {
-            '_id': str(new_student.id),
-            'name': new_student.name,
-            'attendance_percentage': new_student.attendance_percentage,
-            'internal_marks': new_student.internal_marks,
-            'assignment_scores': new_student.assignment_scores,
-            'lab_performance': new_student.lab_performance,
-            'previous_gpa': new_student.previous_gpa,
-            'study_hours': new_student.study_hours,
-            'socio_academic_factors': new_student.socio_academic_factors,
-            'participation_metrics': new_student.participation_metrics
-        }
-        
-        await generate_prediction_for_student(student_data)
-        print(f"✅ Generated AI prediction for new student: {new_student.name}")
-    except Exception as e:
-        print(f"⚠️  Could not generate AI prediction for {new_student.name}: {e}")
+        new_student = await crud.create_student(student=student)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="A student with this email already exists")
+    logger.info("student.created", extra={"student_id": str(new_student.id), "sampled": True})
+    
+    # Generate AI prediction for the new student in the background
+    prediction_queue.enqueue_student(new_student)
     
     return new_student
 
+@router.post("/import", dependencies=[Depends(require_role("admin"))])
+async def import_students(request: Request, format: Optional[str] = None,
+                          batch_size: int = student_import.IMPORT_BATCH_SIZE, score: bool = True):
+    """Stream a CSV or JSONL body of students, upserting by email; bad rows are reported, not fatal"""
+    fmt = format or student_import.detect_format(None, request.headers.get("content-type"))
+    if fmt not in student_import.IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Send text/csv or application/x-ndjson, or pass format=csv|jsonl")
+    if batch_size < 1:
+        raise HTTPException(status_code=400, detail="batch_size must be positive")
+    lines = student_import.iter_lines(request.stream())
+    return await student_import.import_students(lines, fmt, batch_size=batch_size, score=score)
+
+@router.get("/count")
+async def get_students_count(major: Optional[str] = None, enrollment_year: Optional[int] = None):
+    # Declared before /{student_id} so "count" is not treated as an ID
+    count = await crud.count_students(major=major, enrollment_year=enrollment_year)
+    return {"count": count}
+
 @router.get("/{student_id}", response_model=schemas.Student)
 async def read_student(student_id: str):
     db_student = await crud.get_student(student_id=student_id)
@@ -72,15 +48,25 @@ async def read_student(student_id: str):
         raise HTTPException(status_code=404, detail="Student not found")
     return db_student
 
+@router.get("/{student_id}/prediction-status")
+async def get_prediction_status(student_id: str):
+    status = prediction_queue.get_status(student_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="No prediction job for this student")
+    return status
+
 @router.get("/by-user/{user_id}", response_model=schemas.Student)
 async def get_student_by_user_id(user_id: str):
-    # Find student by user_id
-    students = await crud.get_students()
-    student = next((s for s in students if s.user_id == user_id), None)
+    student = await crud.get_student_by_user_id(user_id=user_id)
     if student is None:
         raise HTTPException(status_code=404, detail="Student not found")
     return student
 
+@router.post("/by-user", response_model=list[schemas.Student])
+async def get_students_by_user_ids(user_ids: list[str]):
+    # Resolve many user IDs in a single query; unknown IDs are omitted
+    return await crud.get_students_by_user_ids(user_ids=user_ids)
+
 @router.get("/", response_model=list[schemas.Student])
 async def read_students(skip: int = 0, limit: int = 100):
     students = await crud.get_students(skip=skip, limit=limit)
@@ -88,30 +74,16 @@ async def read_students(skip: int = 0, limit: int = 100):
 
 @router.put("/{student_id}", response_model=schemas.Student)
 async def update_student(student_id: str, student: schemas.StudentUpdate):
-    db_student = await crud.update_student(student_id=student_id, student=student)
+    try:
+        db_student = await crud.update_student(student_id=student_id, student=student)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="A student with this email already exists")
     if db_student is None:
         raise HTTPException(status_code=404, detail="Student not found")
     
-    # Generate AI prediction for the updated student
-    try:
-        # Convert student to dict for ML service
-        student_data = {
-            '_id': str(db_student.id),
-            'name': db_student.name,
-            'attendance_percentage': db_student.attendance_percentage,
-            'internal_marks': db_student.internal_marks,
-            'assignment_scores': db_student.assignment_scores,
-            'lab_performance': db_student.lab_performance,
-            'previous_gpa': db_student.previous_gpa,
-            'study_hours': db_student.study_hours,
-            'socio_academic_factors': db_student.socio_academic_factors,
-            'participation_metrics': db_student.participation_metrics
-        }
-        
-        await generate_prediction_for_student(student_data)
-        print(f"✅ Generated AI prediction for updated student: {db_student.name}")
-    except Exception as e:
-        print(f"⚠️  Could not generate AI prediction for updated student {db_student.name}: {e}")
+    # Regenerate AI prediction in the background unless the model inputs are unchanged
+    if not prediction_is_current(db_student):
+        prediction_queue.enqueue_student(db_student)
     
     return db_student
 
@@ -121,8 +93,3 @@ async def delete_student(student_id: str):
     if not success:
         raise HTTPException(status_code=404, detail="Student not found")
     return {"message": "Student deleted"}
-
-@router.get("/count")
-async def get_students_count():
-    students = await crud.get_students()
-    return {"count": len(students)}
\ No newline at end of file
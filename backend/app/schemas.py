@@ -59,8 +59,18 @@ class StudentUpdate(BaseModel):
     socio_academic_factors: Optional[Dict[str, Any]] = None
     participation_metrics: Optional[float] = None
 
+class CurrentPrediction(BaseModel):
+    prediction_id: str
+    predicted_performance: str
+    risk_score: float
+    recommendations: List[str]
+    feature_fingerprint: Optional[str] = None
+    model_version: Optional[str] = None
+    created_at: datetime
+
 class Student(StudentBase):
     id: PydanticObjectId = Field(alias="_id")
+    current_prediction: Optional[CurrentPrediction] = None
     created_at: datetime
     updated_at: datetime
 
@@ -87,12 +97,15 @@ class PredictionResponse(BaseModel):
     risk_score: float
     recommendations: List[str]
     feature_importance: Optional[Dict[str, Any]] = None
+    model_version: Optional[str] = None
 
 class PredictionBase(BaseModel):
     student_id: str
     predicted_performance: str
     risk_score: float
     recommendations: List[str]
+    feature_fingerprint: Optional[str] = None
+    model_version: Optional[str] = None
 
 class PredictionCreate(PredictionBase):
     pass
@@ -0,0 +1,168 @@
+import asyncio
+import codecs
+import csv
+import json
+import logging
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+
+from app import crud, schemas
+from app.rescore import rescore_student_ids
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "1000"))
+IMPORT_FORMATS = ("csv", "jsonl")
+
+_student_list = TypeAdapter(List[schemas.StudentCreate])
+_scoring_tasks = set()
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a stream of UTF-8 byte chunks into lines without buffering the whole body"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+async def file_chunks(path: str, chunk_size: int = 1 << 16) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+async def iter_records(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield (row number, record dict or error message) for every data row"""
+    header = None
+    record, row_number, line_number = "", 0, 0
+    async for line in lines:
+        line_number += 1
+        if fmt == "jsonl":
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                value = json.loads(line)
+                yield row_number, value if isinstance(value, dict) else "Row is not a JSON object"
+            except json.JSONDecodeError as e:
+                yield row_number, f"Invalid JSON: {e.msg}"
+            continue
+
+        # A CSV record ends once its quotes are balanced; quoted fields may span lines
+        record += line + "\n"
+        if record.count('"') % 2:
+            continue
+        text, record = record, ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row_number += 1
+        if len(values) != len(header):
+            yield row_number, f"Expected {len(header)} columns, got {len(values)}"
+        else:
+            yield row_number, dict(zip(header, values))
+    if record.strip():
+        yield row_number + 1, "Unterminated quoted field"
+
+def normalize_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop empty CSV cells and decode JSON-encoded socio_academic_factors"""
+    record = {key: value for key, value in record.items() if value != ""}
+    factors = record.get("socio_academic_factors")
+    if isinstance(factors, str):
+        try:
+            record["socio_academic_factors"] = json.loads(factors)
+        except json.JSONDecodeError:
+            pass  # Reported by validation
+    record.setdefault("socio_academic_factors", {})
+    return record
+
+def validate_batch(records: List[Dict[str, Any]]):
+    """Validate a batch in one call; returns (valid students, {batch index: error})"""
+    try:
+        return _student_list.validate_python(records), {}
+    except ValidationError as e:
+        errors = {}
+        for error in e.errors():
+            index, *field = error["loc"]
+            message = f"{'.'.join(map(str, field)) or 'row'}: {error['msg']}"
+            errors.setdefault(index, []).append(message)
+    valid = [record for i, record in enumerate(records) if i not in errors]
+    return _student_list.validate_python(valid), {i: "; ".join(messages) for i, messages in errors.items()}
+
+async def import_students(lines: AsyncIterator[str], fmt: str, batch_size: int = IMPORT_BATCH_SIZE,
+                          score: bool = False, wait_for_scoring: bool = False) -> Dict[str, Any]:
+    """Validate and upsert students (keyed by email) batch by batch.
+
+    Bad rows are reported with their row number and never abort the import.
+    With score=True the imported students are scored in batches afterwards,
+    in the background unless wait_for_scoring is set.
+    """
+    report = {"rows": 0, "inserted": 0, "updated": 0, "failed": 0, "errors": []}
+    student_ids = []
+
+    def add_error(row_number: int, message: str):
+        report["failed"] += 1
+        if len(report["errors"]) < IMPORT_MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": row_number, "error": message})
+
+    async def flush(batch: List[Tuple[int, Dict[str, Any]]]):
+        students, errors = validate_batch([record for _, record in batch])
+        row_numbers = [row_number for i, (row_number, _) in enumerate(batch) if i not in errors]
+        for i, message in errors.items():
+            add_error(batch[i][0], message)
+        if not students:
+            return
+
+        # Later rows for the same email win, so each email is written once per batch
+        latest = {student.email: (row_number, student) for row_number, student in zip(row_numbers, students)}
+        unique = list(latest.values())
+        inserted, updated, ids_by_email, write_errors = await crud.upsert_students([s for _, s in unique])
+        report["inserted"] += inserted
+        report["updated"] += updated
+        for i, message in write_errors.items():
+            add_error(unique[i][0], message)
+        student_ids.extend(ids_by_email.values())
+
+    batch = []
+    async for row_number, record in iter_records(lines, fmt):
+        report["rows"] += 1
+        if isinstance(record, str):
+            add_error(row_number, record)
+            continue
+        batch.append((row_number, normalize_record(record)))
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+
+    report["students"] = len(student_ids)
+    if score and student_ids:
+        if wait_for_scoring:
+            report["scoring"] = await rescore_student_ids(student_ids, batch_size=batch_size)
+        else:
+            task = asyncio.create_task(rescore_student_ids(student_ids, batch_size=batch_size))
+            _scoring_tasks.add(task)
+            task.add_done_callback(_scoring_tasks.discard)
+            report["scoring"] = "queued"
+    logger.info("students.imported", extra={k: report[k] for k in ("rows", "inserted", "updated", "failed")})
+    return report
+
+def detect_format(name: Optional[str], content_type: Optional[str] = None) -> Optional[str]:
+    """Infer csv/jsonl from a file name or content type"""
+    name, content_type = (name or "").lower(), (content_type or "").lower()
+    if name.endswith((".jsonl", ".ndjson")) or "ndjson" in content_type or "jsonl" in content_type:
+        return "jsonl"
+    if name.endswith(".csv") or "csv" in content_type:
+        return "csv"
+    return None
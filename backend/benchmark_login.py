@@ -0,0 +1,61 @@
+import argparse
+import asyncio
+import statistics
+import time
+from app.password_pool import PasswordHashPool
+from app.routers.auth import hash_password, verify_password
+
+async def heartbeat(stop: asyncio.Event, lags: list, interval: float = 0.01):
+    """Record how late the event loop wakes up; large lags mean the loop was blocked"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+async def run_logins(logins: int, hashed: str, pool: PasswordHashPool = None):
+    """Verify `logins` passwords concurrently, either inline or through the pool"""
+    latencies = []
+
+    async def login():
+        start = time.perf_counter()
+        if pool is None:
+            verify_password("correct horse battery staple", hashed)  # Blocks the event loop
+        else:
+            await pool.run(verify_password, "correct horse battery staple", hashed)
+        latencies.append(time.perf_counter() - start)
+
+    stop, lags = asyncio.Event(), []
+    monitor = asyncio.create_task(heartbeat(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+
+    latencies.sort()
+    return {
+        "logins_per_second": logins / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "max_loop_lag_ms": max(lags, default=0) * 1000
+    }
+
+async def main(args):
+    hashed = hash_password("correct horse battery staple")
+    print(f"{'mode':>10} {'logins/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'max loop lag ms':>16}")
+
+    modes = [("inline", None)] + [(f"pool={size}", size) for size in args.pool_sizes]
+    for label, size in modes:
+        # The queue is sized to admit the whole burst so only throughput is measured
+        pool = PasswordHashPool(workers=size, max_queue=args.logins) if size else None
+        result = await run_logins(args.logins, hashed, pool)
+        if pool is not None:
+            pool.shutdown()
+        print(f"{label:>10} {result['logins_per_second']:>10.1f} {result['p50_ms']:>10.0f} "
+              f"{result['p95_ms']:>10.0f} {result['max_loop_lag_ms']:>16.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Login (bcrypt verify) throughput versus password pool size")
+    parser.add_argument("--logins", type=int, default=64, help="Concurrent logins per run")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,36 @@
+import argparse
+import asyncio
+import json
+from app.database import init_db
+from app.ml_client import ml_client
+from app.logging_config import setup_logging
+from app.student_import import IMPORT_BATCH_SIZE, IMPORT_FORMATS, detect_format, file_chunks, import_students, iter_lines
+
+async def main(args):
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        raise SystemExit("Cannot tell the file format from its name; pass --format csv|jsonl")
+
+    await init_db()
+    await ml_client.start()
+    try:
+        report = await import_students(
+            iter_lines(file_chunks(args.path)), fmt,
+            batch_size=args.batch_size, score=not args.no_score, wait_for_scoring=True
+        )
+    finally:
+        await ml_client.close()
+
+    for error in report["errors"]:
+        print(f"Row {error['row']}: {error['error']}")
+    if "scoring" in report:
+        print(f"Scoring: {json.dumps(report['scoring'])}")
+
+if __name__ == "__main__":
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Bulk import students from a CSV or JSONL file")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS)
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--no-score", action="store_true", help="Skip generating predictions after the import")
+    asyncio.run(main(parser.parse_args()))
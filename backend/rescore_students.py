@@ -0,0 +1,34 @@
+import argparse
+import asyncio
+from app.database import init_db
+from app.ml_client import ml_client
+from app.logging_config import setup_logging
+from app.rescore import DEFAULT_JOB_ID, RESCORE_BATCH_SIZE, rescore_students
+
+async def main(args):
+    await init_db()
+    await ml_client.start()
+    try:
+        job = await rescore_students(
+            job_id=args.job_id,
+            batch_size=args.batch_size,
+            restart=args.restart,
+            skip_current=not args.all
+        )
+    finally:
+        await ml_client.close()
+
+    print(f"Job {args.job_id} {job['state']}: {job['processed']} students processed, "
+          f"{job['scored']} scored, {job['skipped']} already current, "
+          f"{job.get('students_per_second')} students/s")
+    if job["state"] != "completed":
+        print("Run the command again to resume from the last checkpoint.")
+
+if __name__ == "__main__":
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Re-score every student with the current model")
+    parser.add_argument("--job-id", default=DEFAULT_JOB_ID, help="Checkpoint ID; an unfinished job resumes")
+    parser.add_argument("--batch-size", type=int, default=RESCORE_BATCH_SIZE)
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the first student")
+    parser.add_argument("--all", action="store_true", help="Also re-score students whose prediction is current")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,24 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Tests import the backend as `app`, like the services do when started from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def run_with_db(monkeypatch):
+    """Run a coroutine function against a fresh in-memory MongoDB"""
+    from beanie import init_beanie
+    from mongomock_motor import AsyncMongoMockClient
+    from app import database
+
+    def run(test):
+        async def main():
+            db = AsyncMongoMockClient().student_performance
+            monkeypatch.setattr(database, "database", db)
+            await init_beanie(database=db, document_models=database.DOCUMENT_MODELS)
+            return await test()
+        return asyncio.run(main())
+    return run
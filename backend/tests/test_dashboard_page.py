@@ -0,0 +1,79 @@
+import pytest
+from datetime import datetime
+
+from app import crud
+from app.models import CurrentPrediction, Student
+
+# Risk scores with ties and students without a prediction, to exercise the _id tiebreak
+RISKS = [0.8, None, 0.3, 0.8, 0.5, None, 0.3, 0.8, 0.1]
+
+async def insert_students():
+    students = []
+    for i, risk in enumerate(RISKS):
+        prediction = None
+        if risk is not None:
+            prediction = CurrentPrediction(
+                prediction_id=f"p{i}", predicted_performance="Low", risk_score=risk,
+                recommendations=[], created_at=datetime.utcnow()
+            )
+        student = Student(
+            name=f"s{i}", email=f"s{i}@example.com", user_id=f"u{i}", enrollment_year=2020 + i % 2,
+            major="CS", attendance_percentage=80, internal_marks=70, assignment_scores=70, lab_performance=70,
+            previous_gpa=3.0, study_hours=20, socio_academic_factors={}, participation_metrics=70,
+            current_prediction=prediction
+        )
+        await student.insert()
+        students.append(student)
+    return students
+
+async def all_pages(**kwargs):
+    pages, cursor = [], None
+    while True:
+        page = await crud.get_dashboard_page(cursor=cursor, **kwargs)
+        pages.append([item["student"]["id"] for item in page["students"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+def test_cursor_round_trip():
+    student_id = "65a1b2c3d4e5f6a7b8c9d0e1"
+    for value in (None, 0.25, -1):
+        decoded_value, decoded_id = crud.decode_cursor(crud.encode_cursor(value, student_id))
+        assert decoded_value == value
+        assert str(decoded_id) == student_id
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        crud.decode_cursor("not-a-cursor")
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_id_pages_cover_every_student_once(run_with_db, order):
+    async def test():
+        students = await insert_students()
+        pages = await all_pages(limit=2, order=order)
+        expected = sorted(str(s.id) for s in students)
+        assert [len(page) for page in pages] == [2, 2, 2, 2, 1]
+        assert [i for page in pages for i in page] == (expected if order == "asc" else expected[::-1])
+    run_with_db(test)
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_risk_pages_follow_ties_and_missing_predictions(run_with_db, order):
+    async def test():
+        students = await insert_students()
+        pages = await all_pages(limit=2, sort_by="risk_score", order=order)
+        # Missing predictions sort as -1; ties are broken by ascending _id in both orders
+        sign = 1 if order == "asc" else -1
+        expected = sorted(students, key=lambda s: (sign * (s.current_prediction.risk_score if s.current_prediction else -1), str(s.id)))
+        assert [i for page in pages for i in page] == [str(s.id) for s in expected]
+    run_with_db(test)
+
+def test_filters_apply_across_pages(run_with_db):
+    async def test():
+        students = await insert_students()
+        pages = await all_pages(limit=1, min_risk=0.3, enrollment_year=2020)
+        expected = sorted(
+            str(s.id) for s in students
+            if s.enrollment_year == 2020 and s.current_prediction and s.current_prediction.risk_score >= 0.3
+        )
+        assert [i for page in pages for i in page] == expected
+    run_with_db(test)
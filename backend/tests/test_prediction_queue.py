@@ -0,0 +1,99 @@
+import asyncio
+
+from app import prediction_queue as queue_module
+from app.prediction_queue import PredictionQueue
+
+def student(student_id="s1", **features):
+    return {"_id": student_id, "attendance_percentage": 80, **features}
+
+def run_queue(monkeypatch, generate, enqueue, workers=1, max_attempts=3):
+    """Run a queue with `generate` standing in for the ML call until it is idle"""
+    monkeypatch.setattr(queue_module, "generate_prediction_for_student", generate)
+    monkeypatch.setattr(queue_module, "PREDICTION_MAX_ATTEMPTS", max_attempts)
+    monkeypatch.setattr(queue_module, "PREDICTION_RETRY_BACKOFF", 0)
+
+    async def main():
+        queue = PredictionQueue(workers=workers)
+        await enqueue(queue)
+        queue.start()
+        await queue._queue.join()
+        await queue.stop()
+        return queue
+    return asyncio.run(main())
+
+def test_repeated_enqueues_coalesce_into_one_call(monkeypatch):
+    calls = []
+
+    async def generate(data):
+        calls.append(data)
+
+    async def enqueue(queue):
+        for hours in (10, 20, 30):
+            queue.enqueue(student(study_hours=hours))
+
+    queue = run_queue(monkeypatch, generate, enqueue, workers=2)
+    assert [c["study_hours"] for c in calls] == [30]
+    assert queue.get_status("s1")["status"] == "done"
+    assert queue.stats()["queued"] == 0
+
+def test_data_arriving_mid_run_is_scored_after_it(monkeypatch):
+    calls = []
+    events = {}
+
+    async def generate(data):
+        calls.append(data["study_hours"])
+        if len(calls) == 1:
+            events["started"].set()
+            await events["finish"].wait()
+
+    async def enqueue(queue):
+        # Created on the running loop
+        started = events["started"] = asyncio.Event()
+        finish = events["finish"] = asyncio.Event()
+        queue.enqueue(student(study_hours=10))
+
+        async def update_during_run():
+            await started.wait()
+            queue.enqueue(student(study_hours=20))
+            queue.enqueue(student(study_hours=30))
+            finish.set()
+        asyncio.get_running_loop().create_task(update_during_run())
+
+    queue = run_queue(monkeypatch, generate, enqueue, workers=2)
+    # Never two runs for one student at once, and the newest data is scored last
+    assert calls == [10, 30]
+    assert queue.get_status("s1")["status"] == "done"
+
+def test_failures_are_retried_until_success(monkeypatch):
+    attempts = []
+
+    async def generate(data):
+        attempts.append(data["_id"])
+        if len(attempts) < 3:
+            raise RuntimeError("ML service unavailable")
+
+    async def enqueue(queue):
+        queue.enqueue(student())
+
+    queue = run_queue(monkeypatch, generate, enqueue, max_attempts=3)
+    status = queue.get_status("s1")
+    assert len(attempts) == 3
+    assert status["status"] == "done"
+    assert status["attempts"] == 3
+    assert status["last_error"] is None
+
+def test_job_fails_after_max_attempts(monkeypatch):
+    attempts = []
+
+    async def generate(data):
+        attempts.append(data["_id"])
+        raise RuntimeError("ML service unavailable")
+
+    async def enqueue(queue):
+        queue.enqueue(student())
+
+    queue = run_queue(monkeypatch, generate, enqueue, max_attempts=2)
+    status = queue.get_status("s1")
+    assert len(attempts) == 2
+    assert status["status"] == "failed"
+    assert status["last_error"] == "ML service unavailable"
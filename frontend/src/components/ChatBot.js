@@ -1,9 +1,8 @@
 ﻿import React, { useState, useRef, useEffect } from 'react';
-import axios from 'axios';
 import { useAuth } from '../contexts/AuthContext';
 
 const ChatBot = () => {
-  const { user } = useAuth();
+  const { user, logout } = useAuth();
   const [messages, setMessages] = useState([
     {
       id: 1,
@@ -67,38 +66,82 @@ const ChatBot = () => {
     setIsLoading(true);
 
     try {
-      const response = await axios.post(
-        'http://localhost:8004/api/chatbot/chat',
-        {
+      const response = await fetch('http://localhost:8004/api/chatbot/chat/stream', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          ...(user.access_token && { Authorization: `Bearer ${user.access_token}` })
+        },
+        body: JSON.stringify({
           message: messageToSend,
           session_id: sessionId,
           user_email: user.email
-        },
-        {
-          headers: {
-            'Content-Type': 'application/json'
-          }
-        }
-      );
-
-      console.log('ChatBot Debug - API Response:', response.data);
+        })
+      });
+      if (response.status === 401) {
+        // The access token expired or was signed by another server; the user must log in again
+        logout();
+        const error = new Error('Your session has expired. Please log in again.');
+        error.expired = true;
+        throw error;
+      }
+      if (!response.ok) {
+        const body = await response.json().catch(() => ({}));
+        const error = new Error(body.detail || `Chat request failed with status ${response.status}`);
+        error.busy = response.status === 503;
+        throw error;
+      }
 
-      const botResponse = {
-        id: Date.now() + 1,
-        text: response.data.response,
-        sender: 'bot',
-        timestamp: new Date(),
-        followUpQuestions: response.data.follow_up_questions
+      // Server-Sent Events: meta, then a token event per chunk, then done (or error)
+      const botId = Date.now() + 1;
+      let started = false;
+      const showBot = (fields) => {
+        if (!started) {
+          started = true;
+          setIsLoading(false);
+          setMessages(prev => [...prev, { id: botId, sender: 'bot', timestamp: new Date(), ...fields }]);
+        } else {
+          setMessages(prev => prev.map(m => (m.id === botId ? { ...m, ...fields } : m)));
+        }
       };
 
-      setMessages(prev => [...prev, botResponse]);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let text = '';
+      let meta = {};
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const raw of events) {
+          const event = raw.match(/^event: (.*)$/m)?.[1];
+          const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || 'null');
+          if (event === 'meta') {
+            meta = data;
+          } else if (event === 'token') {
+            text += data.text;
+            showBot({ text });
+          } else if (event === 'done') {
+            showBot({ text: data.response, followUpQuestions: meta.follow_up_questions });
+          } else if (event === 'error') {
+            showBot({ text: data.detail, error: true });
+          }
+        }
+      }
+      if (!started) {
+        throw new Error('Chat stream ended without a response');
+      }
     } catch (error) {
       console.error('Error sending message:', error);
-      console.log('ChatBot Debug - Error details:', error.response?.data);
       
       const errorMessage = {
         id: Date.now() + 1,
-        text: "Sorry, I encountered an error processing your request. Please try again later.",
+        text: error.busy || error.expired
+          ? error.message
+          : "Sorry, I encountered an error processing your request. Please try again later.",
         sender: 'bot',
         timestamp: new Date(),
         error: true
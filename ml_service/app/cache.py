@@ -0,0 +1,89 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "3600"))  # seconds
+
+class PredictionCache:
+    """Bounded LRU cache of prediction results with a per-entry TTL.
+
+    Keys hash the float64 feature vector together with the model version, so
+    identical inputs share an entry and a model change never serves stale
+    results. Safe to use from FastAPI's threadpool.
+    """
+
+    def __init__(self, max_size: int = PREDICTION_CACHE_SIZE, ttl: float = PREDICTION_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.model_version: Optional[str] = None
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def key(self, features: np.ndarray, model_version: Optional[str] = None) -> bytes:
+        """Hash a feature vector with the version that scores it (default: the recorded one)"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(model_version or self.model_version).encode())
+        digest.update(np.ascontiguousarray(features, dtype=np.float64).tobytes())
+        return digest.digest()
+
+    def get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: bytes, value: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_model_version(self, version: Optional[str]):
+        """Record the serving model version, dropping every entry if it changed"""
+        with self._lock:
+            if version != self.model_version:
+                self.model_version = version
+                self._entries.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model_version": self.model_version,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+prediction_cache = PredictionCache()
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Compact model artifacts: a directory holding meta.json plus one .npy file per
+# array. Arrays are memory-mapped on load and inference needs only NumPy, so the
+# serving process never imports pickle-era modules, sklearn or xgboost.
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+
+class WeightedRuleModel:
+    """Weighted-score rule model (the exported form of rule_model.RuleBasedModel)"""
+
+    kind = "weighted_rule"
+
+    def __init__(self, weights, defaults, thresholds, class_probabilities):
+        self.weights = weights
+        self.defaults = defaults
+        self.thresholds = thresholds
+        self.class_probabilities = class_probabilities
+
+    def _scores(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        n_features = len(self.weights)
+        if X.shape[1] < n_features:
+            # Rows with fewer features fall back to the default values
+            padded = np.tile(self.defaults, (X.shape[0], 1))
+            padded[:, :X.shape[1]] = X
+            X = padded
+        return X[:, :n_features] @ self.weights
+
+    def predict(self, X):
+        scores = self._scores(X)
+        return (scores >= self.thresholds[0]).astype(np.int64) + (scores >= self.thresholds[1])
+
+    def predict_proba(self, X):
+        return np.asarray(self.class_probabilities)[self.predict(X)]
+
+class LinearModel:
+    """Multinomial (softmax), one-vs-rest or binary linear classifier"""
+
+    kind = "linear"
+
+    def __init__(self, coef, intercept, classes, link):
+        self.coef = coef
+        self.intercept = intercept
+        self.classes = classes
+        self.link = link
+
+    def predict_proba(self, X):
+        scores = np.asarray(X, dtype=np.float64) @ self.coef.T + self.intercept
+        if self.coef.shape[0] == 1:
+            # Binary models store a single row of weights for the positive class
+            positive = 1 / (1 + np.exp(-scores[:, 0]))
+            return np.column_stack([1 - positive, positive])
+        if self.link == "ovr":
+            probabilities = 1 / (1 + np.exp(-scores))
+        else:
+            probabilities = np.exp(scores - scores.max(axis=1, keepdims=True))
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return np.asarray(self.classes)[self.predict_proba(X).argmax(axis=1)]
+
+class TreeEnsembleModel:
+    """Averaged decision trees stored as flat node arrays (sklearn forest/tree layout)"""
+
+    kind = "tree_ensemble"
+
+    def __init__(self, children_left, children_right, feature, threshold, value, roots, classes, cover=None):
+        self.children_left = children_left
+        self.children_right = children_right
+        self.feature = feature
+        self.threshold = threshold
+        self.value = value
+        self.roots = roots
+        self.classes = classes
+        self.cover = cover  # Training samples reaching each node (not needed to predict or explain)
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        rows = np.arange(X.shape[0])
+        total = np.zeros((X.shape[0], self.value.shape[1]))
+        for root in self.roots:
+            # Walk every row down the tree at once until all have reached a leaf
+            node = np.full(X.shape[0], root, dtype=np.int64)
+            internal = self.children_left[node] >= 0
+            while internal.any():
+                go_left = X[rows, self.feature[node]] <= self.threshold[node]
+                child = np.where(go_left, self.children_left[node], self.children_right[node])
+                node = np.where(internal, child, node)
+                internal = self.children_left[node] >= 0
+            total += self.value[node]
+        return total / len(self.roots)
+
+    def predict(self, X):
+        return np.asarray(self.classes)[self.predict_proba(X).argmax(axis=1)]
+
+MODEL_KINDS = {cls.kind: cls for cls in (WeightedRuleModel, LinearModel, TreeEnsembleModel)}
+
+def model_arrays(model):
+    """Return (kind, arrays, params) for a supported model, or None.
+
+    Raises ValueError for a scaling pipeline whose scaler cannot be folded.
+    """
+    if all(hasattr(model, attr) for attr in ("WEIGHTS", "DEFAULTS", "THRESHOLDS", "CLASS_PROBABILITIES")):
+        return "weighted_rule", {
+            "weights": np.asarray(model.WEIGHTS, dtype=np.float64),
+            "defaults": np.asarray(model.DEFAULTS, dtype=np.float64),
+            "thresholds": np.asarray(model.THRESHOLDS, dtype=np.float64),
+            "class_probabilities": np.asarray(model.CLASS_PROBABILITIES, dtype=np.float64),
+        }, {}
+
+    steps = getattr(model, "steps", None)
+    if steps and len(steps) == 2 and hasattr(steps[0][1], "scale_"):
+        # Only reached for sklearn pipelines, so importing sklearn here costs nothing extra
+        from sklearn.preprocessing import StandardScaler
+
+        # StandardScaler + linear pipeline: fold the scaling into the weights,
+        # w.(x - mean)/scale + b == (w/scale).x + (b - (w/scale).mean)
+        scaler, estimator = steps[0][1], steps[1][1]
+        if not isinstance(scaler, StandardScaler):
+            # MinMaxScaler, RobustScaler, ... transform differently; folding them would be wrong
+            raise ValueError(f"Cannot fold {type(scaler).__name__} into a compact linear model")
+        exported = model_arrays(estimator)
+        if exported is None or exported[0] != "linear":
+            return None
+        kind, arrays, params = exported
+        scale = scaler.scale_ if scaler.scale_ is not None else 1.0
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(arrays["coef"].shape[1])
+        arrays["coef"] = arrays["coef"] / scale
+        arrays["intercept"] = arrays["intercept"] - arrays["coef"] @ mean
+        return kind, arrays, params
+
+    if hasattr(model, "coef_") and hasattr(model, "intercept_") and hasattr(model, "predict_proba"):
+        link = "ovr" if getattr(model, "multi_class", "auto") == "ovr" else "softmax"
+        return "linear", {
+            "coef": np.asarray(model.coef_, dtype=np.float64),
+            "intercept": np.asarray(model.intercept_, dtype=np.float64),
+            "classes": np.asarray(model.classes_),
+        }, {"link": link}
+
+    trees = getattr(model, "estimators_", None)
+    if trees is None and hasattr(model, "tree_"):
+        trees = [model]
+    if trees is not None and all(hasattr(tree, "tree_") for tree in trees):
+        left, right, feature, threshold, value, cover, roots = [], [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            t = tree.tree_
+            children_left = t.children_left.astype(np.int64)
+            children_right = t.children_right.astype(np.int64)
+            left.append(np.where(children_left >= 0, children_left + offset, -1))
+            right.append(np.where(children_right >= 0, children_right + offset, -1))
+            feature.append(np.maximum(t.feature, 0).astype(np.int64))
+            threshold.append(t.threshold.astype(np.float64))
+            counts = t.value[:, 0, :].astype(np.float64)
+            value.append(counts / np.maximum(counts.sum(axis=1, keepdims=True), 1e-12))
+            cover.append(t.weighted_n_node_samples.astype(np.float64))
+            roots.append(offset)
+            offset += t.node_count
+        return "tree_ensemble", {
+            "children_left": np.concatenate(left),
+            "children_right": np.concatenate(right),
+            "feature": np.concatenate(feature),
+            "threshold": np.concatenate(threshold),
+            "value": np.concatenate(value),
+            "cover": np.concatenate(cover),
+            "roots": np.asarray(roots, dtype=np.int64),
+            "classes": np.asarray(model.classes_),
+        }, {}
+
+    return None
+
+def can_export(model) -> bool:
+    try:
+        return model_arrays(model) is not None
+    except ValueError:
+        return False
+
+def export_model(model, path: str):
+    """Write a model as a compact artifact directory; raises ValueError if unsupported"""
+    exported = model_arrays(model)
+    if exported is None:
+        raise ValueError(f"{type(model).__name__} cannot be exported to the compact format")
+    kind, arrays, params = exported
+
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), array, allow_pickle=False)
+    meta = {"format_version": FORMAT_VERSION, "kind": kind, "arrays": sorted(arrays), "params": params}
+    with open(os.path.join(path, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+
+def load_model(path: str):
+    """Load a compact artifact directory, memory-mapping its arrays"""
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compact model format: {meta.get('format_version')}")
+    arrays = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+        for name in meta["arrays"]
+    }
+    return MODEL_KINDS[meta["kind"]](**arrays, **meta["params"])
+
+def artifact_sha256(path: str) -> str:
+    """Hash of every file in an artifact directory, in name order"""
+    digest = hashlib.sha256()
+    for filename in sorted(os.listdir(path)):
+        digest.update(filename.encode())
+        with open(os.path.join(path, filename), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
@@ -0,0 +1,215 @@
+from math import factorial
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app import compact
+from app.registry import FEATURE_ORDER
+
+# Attributions explain the Low-performance (risk) output: positive values push a
+# student towards Low, negative values away from it. Each explainer is built once
+# per served model, so its expected value is computed a single time and every call
+# explains a whole feature matrix at once.
+EXPLAINED_CLASS = 0
+
+# Reference student when no background sample is available: the prediction
+# request defaults, with the engineered features derived from them
+DEFAULT_BACKGROUND = [[75.0, 70.0, 75.0, 70.0, 3.0, 20.0, 75.0, 215.0 / 3, 56.25]]
+
+class LinearExplainer:
+    """Exact contributions of a linear score: w_j * (x_j - E[x_j])"""
+
+    method = "linear"
+
+    def __init__(self, weights: np.ndarray, intercept: float, background: np.ndarray):
+        self.weights = weights
+        self.mean = background.mean(axis=0)
+        self.expected_value = float(self.mean @ weights + intercept)
+
+    def explain(self, X: np.ndarray) -> np.ndarray:
+        return (X - self.mean) * self.weights
+
+class TreeExplainer:
+    """TreeSHAP values of the explained class via the shap package (pickled tree models only)"""
+
+    method = "tree_shap"
+
+    def __init__(self, explainer):
+        self.explainer = explainer
+        self.expected_value = float(np.atleast_1d(explainer.expected_value)[EXPLAINED_CLASS])
+
+    def explain(self, X: np.ndarray) -> np.ndarray:
+        values = self.explainer.shap_values(X, check_additivity=False)
+        if isinstance(values, list):  # Older shap: one array per class
+            return np.asarray(values[EXPLAINED_CLASS])
+        values = np.asarray(values)
+        return values[:, :, EXPLAINED_CLASS] if values.ndim == 3 else values
+
+class TreeBaselineShapleyExplainer:
+    """Exact Shapley values of a compact tree ensemble against one reference row, in NumPy only.
+
+    Each leaf is reached when every feature on its path takes a value inside the
+    leaf's interval. Against a reference, that makes a leaf's game depend only on
+    how many path features must come from the student (a) and from the reference
+    (b), so its Shapley values have a closed form: v * (a-1)! b! / (a+b)! for each
+    student-side feature and -v * a! (b-1)! / (a+b)! for each reference-side one.
+    The cost is one (rows x leaves x features) comparison instead of 2^k model calls.
+    """
+
+    method = "tree_baseline_shapley"
+    CHUNK_ELEMENTS = 4_000_000  # Bounds the (rows x leaves x features) work arrays
+
+    def __init__(self, model: compact.TreeEnsembleModel, reference: np.ndarray):
+        n_features = len(reference)
+        lower, upper, values = [], [], []
+        for root in model.roots:
+            # Depth-first walk collecting each leaf's interval lower < x <= upper per feature
+            stack = [(int(root), np.full(n_features, -np.inf), np.full(n_features, np.inf))]
+            while stack:
+                node, low, high = stack.pop()
+                left, right = int(model.children_left[node]), int(model.children_right[node])
+                if left < 0:
+                    lower.append(low)
+                    upper.append(high)
+                    values.append(model.value[node, EXPLAINED_CLASS])
+                    continue
+                feature, threshold = int(model.feature[node]), float(model.threshold[node])
+                left_high, right_low = high.copy(), low.copy()
+                left_high[feature] = min(high[feature], threshold)
+                right_low[feature] = max(low[feature], threshold)
+                stack.append((left, low, left_high))
+                stack.append((right, right_low, high))
+        self.lower = np.asarray(lower)
+        self.upper = np.asarray(upper)
+        self.values = np.asarray(values, dtype=np.float64) / len(model.roots)  # Trees are averaged
+        self.reference_in = (reference > self.lower) & (reference <= self.upper)
+
+        # Closed-form weights indexed by (a, b); zero where the side is empty
+        k = n_features + 1
+        self.student_weight = np.zeros((k, k))
+        self.reference_weight = np.zeros((k, k))
+        for a in range(k):
+            for b in range(k - a):
+                if a:
+                    self.student_weight[a, b] = factorial(a - 1) * factorial(b) / factorial(a + b)
+                if b:
+                    self.reference_weight[a, b] = factorial(a) * factorial(b - 1) / factorial(a + b)
+        self.expected_value = float(np.asarray(model.predict_proba(reference[None, :]))[0, EXPLAINED_CLASS])
+
+    def explain(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        attributions = np.zeros_like(X)
+        chunk = max(1, self.CHUNK_ELEMENTS // max(1, self.lower.size))
+        for start in range(0, X.shape[0], chunk):
+            rows = X[start:start + chunk, None, :]
+            student_in = (rows > self.lower) & (rows <= self.upper)
+            student_only = student_in & ~self.reference_in
+            reference_only = self.reference_in & ~student_in
+            reached = (student_in | self.reference_in).all(axis=2) * self.values
+            a, b = student_only.sum(axis=2), reference_only.sum(axis=2)
+            attributions[start:start + chunk] = (
+                np.einsum("nl,nlf->nf", reached * self.student_weight[a, b], student_only)
+                - np.einsum("nl,nlf->nf", reached * self.reference_weight[a, b], reference_only)
+            )
+        return attributions
+
+class BaselineShapleyExplainer:
+    """Exact Shapley values of any vectorized scoring function against one reference row.
+
+    Every coalition of the explained features is evaluated in a single call to
+    `score`, so the cost is 2^k rows per explained row; use it for few features
+    or as the fallback for models with no specialised explainer.
+    """
+
+    method = "baseline_shapley"
+
+    def __init__(self, score: Callable[[np.ndarray], np.ndarray], reference: np.ndarray,
+                 features: Optional[Sequence[int]] = None):
+        self.score = score
+        self.reference = reference
+        self.features = list(features) if features is not None else list(range(len(reference)))
+        k = len(self.features)
+        self.masks = np.arange(1 << k)
+        self.in_coalition = (self.masks[:, None] >> np.arange(k)) & 1 == 1
+        sizes = self.in_coalition.sum(axis=1)
+        # Shapley weight of adding a feature to a coalition of each size
+        self.weights = np.array([factorial(s) * factorial(k - s - 1) / factorial(k) for s in range(k)])[
+            np.minimum(sizes, k - 1)
+        ]
+        self.expected_value = float(score(reference[None, :])[0])
+
+    def explain(self, X: np.ndarray) -> np.ndarray:
+        n, n_masks = X.shape[0], len(self.masks)
+        # One row per (coalition, student): features outside the coalition take the reference value
+        rows = np.broadcast_to(self.reference, (n_masks, n, X.shape[1])).copy()
+        for j, feature in enumerate(self.features):
+            rows[self.in_coalition[:, j], :, feature] = X[:, feature]
+        values = np.asarray(self.score(rows.reshape(-1, X.shape[1]))).reshape(n_masks, n)
+
+        attributions = np.zeros_like(X, dtype=np.float64)
+        for j, feature in enumerate(self.features):
+            without = self.masks[~self.in_coalition[:, j]]
+            marginal = values[without | (1 << j)] - values[without]
+            attributions[:, feature] = self.weights[without] @ marginal
+        return attributions
+
+def _explained_linear(coef: np.ndarray, intercept: np.ndarray):
+    """Weights and intercept of the explained class's linear score"""
+    if coef.shape[0] == 1:
+        # Binary models score the positive class; Low is the negative one
+        return -coef[0], -float(intercept[0])
+    return coef[EXPLAINED_CLASS], float(intercept[EXPLAINED_CLASS])
+
+def _tree_explainer(model) -> Optional[TreeExplainer]:
+    # shap (and through it sklearn) is imported only for pickled tree models
+    try:
+        import shap
+    except ImportError:
+        return None
+    try:
+        return TreeExplainer(shap.TreeExplainer(model))
+    except Exception:
+        return None  # Not a tree model shap understands
+
+def build_explainer(model, background: Optional[List[List[float]]] = None):
+    """Pick the exact explainer for a model: linear contributions, tree or generic baseline Shapley, or TreeSHAP"""
+    background = np.asarray(background if background is not None else DEFAULT_BACKGROUND, dtype=np.float64)
+    n_features = background.shape[1]
+
+    if isinstance(model, compact.LinearModel):
+        return LinearExplainer(*_explained_linear(np.asarray(model.coef), np.asarray(model.intercept)), background)
+    if isinstance(model, compact.TreeEnsembleModel):
+        return TreeBaselineShapleyExplainer(model, background.mean(axis=0))
+    if isinstance(model, compact.WeightedRuleModel):
+        weights = np.asarray(model.weights)
+    else:
+        try:
+            parameters = compact.model_arrays(model)
+        except ValueError:
+            parameters = None  # Explained below by TreeSHAP or baseline Shapley
+        kind, arrays = (parameters[0], parameters[1]) if parameters else (None, None)
+        if kind == "linear":
+            return LinearExplainer(*_explained_linear(arrays["coef"], arrays["intercept"]), background)
+        weights = arrays["weights"] if kind == "weighted_rule" else None
+
+    if weights is not None:
+        # Rule models: a higher weighted score means better performance, so negate it
+        padded = np.zeros(n_features)
+        padded[:len(weights)] = -weights
+        return LinearExplainer(padded, 0.0, background)
+
+    explainer = _tree_explainer(model)
+    if explainer is not None:
+        return explainer
+
+    return BaselineShapleyExplainer(
+        lambda X: np.asarray(model.predict_proba(X))[:, EXPLAINED_CLASS], background.mean(axis=0)
+    )
+
+def attribution_dicts(attributions: np.ndarray) -> List[Dict[str, float]]:
+    """Per-row {feature: attribution}, largest absolute attribution first"""
+    results = []
+    for row in np.asarray(attributions).tolist():
+        ranked = sorted(zip(FEATURE_ORDER, row), key=lambda item: -abs(item[1]))
+        results.append({feature: round(value, 4) + 0.0 for feature, value in ranked})  # + 0.0 drops -0.0
+    return results
@@ -1,8 +1,22 @@
+from contextlib import asynccontextmanager
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import predict_simple
+from fastapi.responses import JSONResponse
+from app.routers import predict_simple, predict
 
-app = FastAPI(title="Student Performance ML Service", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load, validate and warm up models before serving traffic
+    predict_simple.warm_up()
+    await asyncio.to_thread(predict.initialize)
+    # Optionally watch the model directory and hot-swap new artifacts
+    watcher = predict.start_watcher()
+    yield
+    if watcher is not None:
+        watcher.set()
+
+app = FastAPI(title="Student Performance ML Service", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -14,6 +28,7 @@ app.add_middleware(
 )
 
 app.include_router(predict_simple.router, prefix="/api", tags=["predictions"])
+app.include_router(predict.router, prefix="/api/models", tags=["models"])
 
 @app.get("/")
 def read_root():
@@ -21,4 +36,17 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    # Liveness: the process is up; readiness is reported alongside
+    return {
+        "status": "healthy",
+        "ready": predict.ready,
+        "model_version": predict_simple.serving_version(),
+        "models": predict.loaded_models(),
+        "error": predict.load_error
+    }
+
+@app.get("/health/ready")
+def readiness_check():
+    if not predict.ready:
+        return JSONResponse(status_code=503, content={"ready": False, "error": predict.load_error})
+    return {"ready": True}
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app import compact
+
+# Layout: <version>/manifest.json plus one artifact per model in each published
+# version (a compact .npy directory, or <model>.pkl for models that cannot be
+# exported), and a CURRENT file naming the version being served
+REGISTRY_DIR = os.getenv(
+    "MODEL_REGISTRY_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../models/registry")
+)
+CURRENT_POINTER = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+
+FEATURE_ORDER = [
+    'attendance_percentage', 'internal_marks', 'assignment_scores', 'lab_performance',
+    'previous_gpa', 'study_hours', 'participation_metrics', 'total_score', 'academic_engagement'
+]
+CLASS_MAP = {0: 'Low', 1: 'Medium', 2: 'High'}
+
+def model_stem(name: str) -> str:
+    return name.lower().replace(' ', '_')
+
+def model_filename(name: str) -> str:
+    return model_stem(name) + '.pkl'
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _write_atomic(path: str, content: str):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def publish_version(models: Dict[str, Any], best_model: str, metrics: Dict[str, Any],
+                    version: Optional[str] = None, make_current: bool = True,
+                    registry_dir: str = REGISTRY_DIR, background: Optional[List[List[float]]] = None) -> str:
+    """Save a model set as a new immutable version and optionally point CURRENT at it.
+
+    Models the compact format supports are exported to it; anything else is pickled.
+    `background` is a small sample of training rows stored in the manifest as the
+    reference data for feature attributions.
+    """
+    version = version or datetime.utcnow().strftime("v%Y%m%d-%H%M%S")
+    version_dir = os.path.join(registry_dir, version)
+    os.makedirs(version_dir, exist_ok=False)
+
+    files = {}
+    for name, model in models.items():
+        if compact.can_export(model):
+            path = os.path.join(version_dir, model_stem(name))
+            compact.export_model(model, path)
+            files[name] = {"format": "compact", "file": model_stem(name), "sha256": compact.artifact_sha256(path)}
+        else:
+            import joblib
+            filename = model_filename(name)
+            path = os.path.join(version_dir, filename)
+            joblib.dump(model, path)
+            files[name] = {"format": "pickle", "file": filename, "sha256": file_sha256(path)}
+
+    combined = hashlib.sha256("".join(files[name]["sha256"] for name in sorted(files)).encode())
+    manifest = {
+        "version": version,
+        "created_at": datetime.utcnow().isoformat(),
+        "feature_order": FEATURE_ORDER,
+        "class_map": {str(k): v for k, v in CLASS_MAP.items()},
+        "best_model": best_model,
+        "metrics": metrics,
+        "files": files,
+        "hash": combined.hexdigest()
+    }
+    if background is not None:
+        manifest["background"] = [[float(v) for v in row] for row in background]
+    _write_atomic(os.path.join(version_dir, MANIFEST_FILE), json.dumps(manifest, indent=2))
+
+    if make_current:
+        set_current(version, registry_dir)
+    return version
+
+def set_current(version: str, registry_dir: str = REGISTRY_DIR):
+    if not os.path.exists(os.path.join(registry_dir, version, MANIFEST_FILE)):
+        raise ValueError(f"Unknown model version: {version}")
+    _write_atomic(os.path.join(registry_dir, CURRENT_POINTER), version)
+
+def current_version(registry_dir: str = REGISTRY_DIR) -> Optional[str]:
+    try:
+        with open(os.path.join(registry_dir, CURRENT_POINTER)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def read_manifest(version: str, registry_dir: str = REGISTRY_DIR) -> Dict[str, Any]:
+    with open(os.path.join(registry_dir, version, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+def list_versions(registry_dir: str = REGISTRY_DIR) -> List[Dict[str, Any]]:
+    """Manifests of every published version, oldest first"""
+    if not os.path.isdir(registry_dir):
+        return []
+    manifests = []
+    for entry in sorted(os.listdir(registry_dir)):
+        if os.path.exists(os.path.join(registry_dir, entry, MANIFEST_FILE)):
+            manifests.append(read_manifest(entry, registry_dir))
+    return manifests
+
+def load_version(version: str, registry_dir: str = REGISTRY_DIR, best_only: bool = False):
+    """Load a version's models after checking the artifacts against the manifest hashes.
+
+    With best_only, only the manifest's best_model is read, so serving never
+    unpickles (or imports the libraries of) models it does not use.
+    """
+    manifest = read_manifest(version, registry_dir)
+    names = [manifest["best_model"]] if best_only else list(manifest["files"])
+    models = {}
+    for name in names:
+        entry = manifest["files"][name]
+        path = os.path.join(registry_dir, version, entry["file"])
+        if entry.get("format") == "compact":
+            checksum = compact.artifact_sha256(path)
+        else:
+            checksum = file_sha256(path)
+        if checksum != entry["sha256"]:
+            raise ValueError(f"Checksum mismatch for {entry['file']} in model version {version}")
+
+        if entry.get("format") == "compact":
+            models[name] = compact.load_model(path)
+        else:
+            # Pickled artifacts need joblib and the model's defining module importable
+            import joblib
+            models[name] = joblib.load(path)
+    return models, manifest
@@ -1,45 +1,209 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Header, HTTPException
 from pydantic import BaseModel
-from typing import List, Dict
-import joblib
+from typing import Callable, List, Dict, Any, Optional
+from datetime import datetime
 import os
+import secrets
+import threading
+import numpy as np
+from app import explain, registry
 
 router = APIRouter()
 
-# Global variables for models (loaded lazily)
-rf_model = None
-xgb_model = None
-lr_model = None
-nn_model = None
-scaler = None
-best_model = None
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.join(os.path.dirname(__file__), "../../../models"))
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "0"))  # seconds; 0 disables watching
+MODEL_ADMIN_TOKEN = os.getenv("MODEL_ADMIN_TOKEN")  # Unset disables POST /reload
 
-def load_models():
-    global rf_model, xgb_model, lr_model, nn_model, scaler, best_model
-    if rf_model is None:
-        MODEL_DIR = os.path.join(os.path.dirname(__file__), "../../models")
+MODEL_FILES = {
+    'Random Forest': "random_forest.pkl",
+    'XGBoost': "xgboost.pkl",
+    'Logistic Regression': "logistic_regression.pkl",
+    'Neural Network': "neural_network.pkl",
+}
+BEST_MODEL = 'Logistic Regression'  # Best model for unversioned artifacts
+LEGACY_VERSION = "legacy"
+
+class LoadedModels:
+    """An immutable set of models served together.
+
+    Requests read the current set once and use it throughout, so swapping in
+    a new set never affects a prediction that is already in flight.
+    """
+
+    def __init__(self, models: Dict[str, Any], scaler, signature: str,
+                 version: str = LEGACY_VERSION, best_model: str = BEST_MODEL,
+                 manifest: Optional[Dict[str, Any]] = None):
+        self.models = models
+        self.scaler = scaler
+        self.best_model_name = best_model
+        self.best_model = models[best_model]
+        self.signature = signature
+        self.version = version
+        self.manifest = manifest
+        # Built once per model set so the expected value is computed a single time
+        self.explainer = explain.build_explainer(self.best_model, (manifest or {}).get("background"))
+        self.loaded_at = datetime.utcnow()
+
+# Currently served models (loaded eagerly at startup by initialize())
+_current: Optional[LoadedModels] = None
+
+# Called with every newly served model set, e.g. to re-key the prediction cache
+on_models_swapped: List[Callable[[LoadedModels], None]] = []
+
+# Readiness state reported on /health
+ready = False
+load_error: Optional[str] = None
+_models_lock = threading.Lock()
+_reload_lock = threading.Lock()
+reload_status: Dict[str, Any] = {"state": "idle", "error": None, "finished_at": None}
+
+# Synthetic feature rows used to validate models and warm up the prediction path
+WARMUP_FEATURES = [85.0, 75.0, 80.0, 78.0, 3.2, 22.0, 70.0, 77.67, 59.5]
+PROBE_BATCH = [
+    WARMUP_FEATURES,
+    [95.0, 92.0, 90.0, 94.0, 3.9, 35.0, 95.0, 92.0, 90.25],
+    [55.0, 40.0, 45.0, 50.0, 2.1, 6.0, 30.0, 45.0, 16.5],
+]
+
+def validate_model(name: str, model):
+    """Check that a model produces a valid class and a 3-way distribution for every probe row"""
+    predictions = list(model.predict(PROBE_BATCH))
+    probabilities = list(model.predict_proba(PROBE_BATCH))
+    if len(predictions) != len(PROBE_BATCH) or any(int(p) not in (0, 1, 2) for p in predictions):
+        raise ValueError(f"{name} returned invalid predictions: {predictions}")
+    if len(probabilities) != len(PROBE_BATCH) or any(len(p) != 3 or abs(sum(p) - 1) > 1e-6 for p in probabilities):
+        raise ValueError(f"{name} returned invalid probabilities: {probabilities}")
+
+def model_dir_signature() -> str:
+    """Fingerprint of the registry pointer and the model files' sizes and modification times"""
+    parts = [f"current:{registry.current_version()}"]
+    for filename in sorted(MODEL_FILES.values()):
         try:
-            rf_model = joblib.load(os.path.join(MODEL_DIR, "random_forest.pkl"))
-            xgb_model = joblib.load(os.path.join(MODEL_DIR, "xgboost.pkl"))
-            lr_model = joblib.load(os.path.join(MODEL_DIR, "logistic_regression.pkl"))
-            nn_model = joblib.load(os.path.join(MODEL_DIR, "neural_network.pkl"))
-            # For rule-based models, no scaler is needed
-            scaler = None
-            best_model = lr_model  # Logistic Regression as best model
-        except FileNotFoundError as e:
-            raise HTTPException(status_code=500, detail=f"AI model files not found: {str(e)}. Please train the models first.")
-        except Exception as e:
-            # Fallback to rule-based AI models if loading fails
-            from scripts.train_models import RuleBasedModel
-            rf_model = RuleBasedModel('Random Forest')
-            xgb_model = RuleBasedModel('XGBoost')
-            lr_model = RuleBasedModel('Logistic Regression')
-            nn_model = RuleBasedModel('Neural Network')
-            scaler = None  # No scaling for rule-based
-            best_model = lr_model
+            stat = os.stat(os.path.join(MODEL_DIR, filename))
+            parts.append(f"{filename}:{stat.st_size}:{stat.st_mtime_ns}")
+        except FileNotFoundError:
+            parts.append(f"{filename}:missing")
+    return "|".join(parts)
+
+def read_models() -> LoadedModels:
+    """Load and validate a complete model set without touching the served one.
+
+    Uses the registry's current version when one is published, otherwise the
+    unversioned pickles in MODEL_DIR.
+    """
+    signature = model_dir_signature()
+    version = registry.current_version()
+    if version is not None:
+        models, manifest = registry.load_version(version, best_only=True)
+        for name, model in models.items():
+            validate_model(name, model)
+        return LoadedModels(models, scaler=None, signature=signature, version=version,
+                            best_model=manifest["best_model"], manifest=manifest)
+
+    import joblib
+    try:
+        models = {BEST_MODEL: joblib.load(os.path.join(MODEL_DIR, MODEL_FILES[BEST_MODEL]))}
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=500, detail=f"AI model files not found: {str(e)}. Please train the models first.")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"AI model files could not be loaded: {str(e)}. "
+                                                    "Train and publish a model version with scripts/train_models.py.")
+
+    for name, model in models.items():
+        validate_model(name, model)
+
+    return LoadedModels(models, scaler=None, signature=signature)
+
+def _swap(models: LoadedModels):
+    """Serve `models` from now on; call with _models_lock held"""
+    global _current
+    _current = models
+    for callback in on_models_swapped:
+        callback(models)
+
+def load_models():
+    if _current is not None:
+        return
+    # Only one thread loads; concurrent callers wait and then see the loaded models
+    with _models_lock:
+        if _current is None:
+            _swap(read_models())
+
+def current_models() -> LoadedModels:
+    load_models()
+    return _current
+
+def registry_models() -> Optional[LoadedModels]:
+    """The served model set if it came from the registry, else None (nothing published or not loaded yet)"""
+    models = _current
+    return models if models is not None and models.version != LEGACY_VERSION else None
+
+def reload_models():
+    """Load a new model set and atomically swap it in once it validates"""
+    global ready, load_error
+    if not _reload_lock.acquire(blocking=False):
+        return False  # A reload is already running
+    try:
+        reload_status.update(state="reloading", error=None)
+        new_models = read_models()
+        with _models_lock:
+            _swap(new_models)
+        ready, load_error = True, None
+        reload_status.update(state="idle", error=None, finished_at=datetime.utcnow())
+    except Exception as e:
+        # Keep serving the previous models
+        error = e.detail if isinstance(e, HTTPException) else str(e)
+        reload_status.update(state="failed", error=error, finished_at=datetime.utcnow())
+    finally:
+        _reload_lock.release()
+    return True
+
+def watch_model_dir(stop: threading.Event):
+    """Poll MODEL_DIR and reload whenever the model files change"""
+    while not stop.wait(MODEL_WATCH_INTERVAL):
+        models = _current
+        if models is not None and model_dir_signature() != models.signature:
+            reload_models()
+
+def start_watcher() -> Optional[threading.Event]:
+    if MODEL_WATCH_INTERVAL <= 0:
+        return None
+    stop = threading.Event()
+    threading.Thread(target=watch_model_dir, args=(stop,), daemon=True, name="model-watcher").start()
+    return stop
+
+def initialize():
+    """Load and validate every model, then run a warm-up prediction"""
+    global ready, load_error
+    try:
+        load_models()
+        predict_performance(PredictionRequest(
+            student_id="warmup",
+            attendance_percentage=WARMUP_FEATURES[0],
+            internal_marks=WARMUP_FEATURES[1],
+            assignment_scores=WARMUP_FEATURES[2],
+            lab_performance=WARMUP_FEATURES[3],
+            previous_gpa=WARMUP_FEATURES[4],
+            study_hours=WARMUP_FEATURES[5],
+            socio_academic_factors={},
+            participation_metrics=WARMUP_FEATURES[6]
+        ))
+        ready = True
+        load_error = None
+    except Exception as e:
+        ready = False
+        load_error = e.detail if isinstance(e, HTTPException) else str(e)
+    return ready
+
+def loaded_models() -> Dict[str, Optional[str]]:
+    models = _current.models if _current is not None else {}
+    return {
+        filename[:-len(".pkl")]: type(models[name]).__name__ if name in models else None
+        for name, filename in MODEL_FILES.items()
+    }
 
 class PredictionRequest(BaseModel):
-    student_id: int
+    student_id: str
     attendance_percentage: float
     internal_marks: float
     assignment_scores: float
@@ -54,67 +218,66 @@ class PredictionResponse(BaseModel):
     risk_score: float
     recommendations: List[str]
     feature_importance: Dict[str, float]
+    model_version: str
+
+class BatchPredictionResponse(PredictionResponse):
+    student_id: str
+
+PREDICTION_MAP = {0: 'Low', 1: 'Medium', 2: 'High'}
+
+def build_feature_matrix(requests: List[PredictionRequest]) -> np.ndarray:
+    """Build an (n, 9) feature matrix in registry.FEATURE_ORDER, including the engineered columns"""
+    X = np.empty((len(requests), len(registry.FEATURE_ORDER)), dtype=float)
+    X[:, :7] = [[getattr(r, f) for f in registry.FEATURE_ORDER[:7]] for r in requests]
 
-@router.post("/predict", response_model=PredictionResponse)
-def predict_performance(request: PredictionRequest):
-    # Load models if not already loaded
-    load_models()
-    
-    # Prepare input data
-    data = {
-        'attendance_percentage': request.attendance_percentage,
-        'internal_marks': request.internal_marks,
-        'assignment_scores': request.assignment_scores,
-        'lab_performance': request.lab_performance,
-        'previous_gpa': request.previous_gpa,
-        'study_hours': request.study_hours,
-        'participation_metrics': request.participation_metrics,
-    }
-    
     # Feature engineering
-    data['total_score'] = (data['internal_marks'] + data['assignment_scores'] + data['lab_performance']) / 3
-    data['academic_engagement'] = data['attendance_percentage'] * data['participation_metrics'] / 100
-    
-    # Create feature list in correct order
-    features = [data['attendance_percentage'], data['internal_marks'], data['assignment_scores'], 
-                data['lab_performance'], data['previous_gpa'], data['study_hours'], 
-                data['participation_metrics'], data['total_score'], data['academic_engagement']]
-    
-    # Scale features if scaler exists (for trained models), otherwise use raw features (for rule-based)
-    if scaler is not None:
-        X_scaled = scaler.transform([features])  # Assuming scaler has transform method
+    X[:, 7] = (X[:, 1] + X[:, 2] + X[:, 3]) / 3
+    X[:, 8] = X[:, 0] * X[:, 6] / 100
+    return X
+
+def score_requests(models: LoadedModels, requests: List[PredictionRequest]) -> List[dict]:
+    """Predict and explain a batch of requests with one model call each, preserving input order"""
+    X = build_feature_matrix(requests)
+
+    # Scale features if scaler exists (for trained models), otherwise use raw features
+    if models.scaler is not None:
+        X_model = models.scaler.transform(X)
     else:
-        # For rule-based models, use raw feature values
-        X_scaled = [features]
-    
-    # Make prediction
-    prediction_encoded = best_model.predict(X_scaled)[0]
-    prediction_map = {0: 'Low', 1: 'Medium', 2: 'High'}
-    prediction = prediction_map[prediction_encoded]
-    
-    probabilities = best_model.predict_proba(X_scaled)[0]
-    
-    # Risk score (probability of low performance)
-    risk_score = float(probabilities[0])  # Probability of class 0 (Low)
-    
-    # Mock feature importance (since SHAP is not available)
-    feature_importance = {
-        'previous_gpa': 0.35,
-        'attendance_percentage': 0.28,
-        'study_hours': 0.18,
-        'total_score': 0.12,
-        'participation_metrics': 0.07
-    }
-    
-    # Generate recommendations
-    recommendations = generate_recommendations(data, prediction, feature_importance)
-    
-    return PredictionResponse(
-        predicted_performance=prediction,
-        risk_score=risk_score,
-        recommendations=recommendations,
-        feature_importance=feature_importance
-    )
+        X_model = X
+
+    predictions = np.asarray(models.best_model.predict(X_model)).astype(int)
+    probabilities = np.asarray(models.best_model.predict_proba(X_model))
+    attributions = explain.attribution_dicts(models.explainer.explain(X_model))
+
+    results = []
+    for row, pred, probs, feature_importance in zip(X.tolist(), predictions.tolist(), probabilities, attributions):
+        prediction = PREDICTION_MAP[pred]
+        data = dict(zip(registry.FEATURE_ORDER, row))
+        results.append({
+            "predicted_performance": prediction,
+            "risk_score": float(probs[0]),  # Probability of class 0 (Low)
+            "recommendations": generate_recommendations(data, prediction, feature_importance),
+            "feature_importance": feature_importance,
+            "model_version": models.version
+        })
+    return results
+
+@router.post("/predict", response_model=PredictionResponse)
+def predict_performance(request: PredictionRequest):
+    # Read the served model set once so a concurrent reload cannot switch it mid-request
+    models = current_models()
+    return PredictionResponse(**score_requests(models, [request])[0])
+
+@router.post("/predict/batch", response_model=List[BatchPredictionResponse])
+def predict_performance_batch(requests: List[PredictionRequest]):
+    """Predict and explain a whole cohort in one vectorized pass; results are in input order"""
+    if not requests:
+        return []
+    models = current_models()
+    return [
+        BatchPredictionResponse(student_id=request.student_id, **result)
+        for request, result in zip(requests, score_requests(models, requests))
+    ]
 
 def generate_recommendations(data: dict, prediction: str, importance: dict) -> List[str]:
     recs = []
@@ -133,4 +296,33 @@ def generate_recommendations(data: dict, prediction: str, importance: dict) -> L
         recs.append("Excellent performance! Keep up the good work.")
         recs.append("Consider leadership roles or advanced courses.")
     
-    return recs
\ No newline at end of file
+    return recs
+
+@router.post("/reload", status_code=202)
+def trigger_reload(background_tasks: BackgroundTasks, x_admin_token: Optional[str] = Header(None)):
+    """Reload models from MODEL_DIR in the background; in-flight requests finish on the old models"""
+    if not MODEL_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Model reload is disabled; set MODEL_ADMIN_TOKEN to enable it")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, MODEL_ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    if reload_status["state"] == "reloading":
+        return {"status": "already reloading"}
+    background_tasks.add_task(reload_models)
+    return {"status": "reload scheduled"}
+
+@router.get("/status")
+def model_status():
+    models = _current
+    return {
+        "ready": ready,
+        "version": models.version if models else None,
+        "best_model": models.best_model_name if models else None,
+        "models": loaded_models(),
+        "loaded_at": models.loaded_at if models else None,
+        "reload": reload_status
+    }
+
+@router.get("/versions")
+def list_model_versions():
+    """Manifests of all published model versions, for comparing metrics across versions"""
+    return {"current": registry.current_version(), "versions": registry.list_versions()}
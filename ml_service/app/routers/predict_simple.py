@@ -1,9 +1,38 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
+import numpy as np
+from app import explain
+from app.cache import prediction_cache
+from app.routers import predict
 
 router = APIRouter()
 
+# Bump whenever the scoring rules change so cached results are invalidated.
+# The rules only serve while no registry version is published; otherwise
+# /predict scores with the registry's current models and reports their version.
+MODEL_VERSION = "rule-based-1"
+
+def serving_version() -> str:
+    models = predict.registry_models()
+    return models.version if models is not None else MODEL_VERSION
+
+def sync_cache_version(models=None):
+    """Drop cached results as soon as a different model version is served"""
+    prediction_cache.set_model_version(serving_version())
+
+sync_cache_version()
+predict.on_models_swapped.append(sync_cache_version)
+
+# Column order of the feature matrix (raw inputs followed by engineered features)
+RAW_FEATURES = [
+    'attendance_percentage', 'internal_marks', 'assignment_scores',
+    'lab_performance', 'previous_gpa', 'study_hours', 'participation_metrics'
+]
+FEATURE_ORDER = RAW_FEATURES + ['total_score', 'academic_engagement']
+
+PREDICTION_MAP = {0: 'Low', 1: 'Medium', 2: 'High'}
+
 class PredictionRequest(BaseModel):
     student_id: str
     attendance_percentage: Optional[float] = 75.0
@@ -20,64 +49,141 @@ class PredictionResponse(BaseModel):
     risk_score: float
     recommendations: List[str]
     feature_importance: Dict[str, float]
+    model_version: str
+
+class BatchPredictionResponse(BaseModel):
+    student_id: str
+    predicted_performance: str
+    risk_score: float
+    recommendations: List[str]
+    feature_importance: Dict[str, float]
+    model_version: str
+
+def build_feature_matrix(requests: List[PredictionRequest]) -> np.ndarray:
+    """Build an (n, 9) feature matrix including the engineered columns"""
+    X = np.empty((len(requests), len(FEATURE_ORDER)), dtype=float)
+    X[:, :len(RAW_FEATURES)] = [[getattr(r, f) for f in RAW_FEATURES] for r in requests]
+
+    # Feature engineering
+    X[:, 7] = (X[:, 1] + X[:, 2] + X[:, 3]) / 3
+    X[:, 8] = X[:, 0] * X[:, 6] / 100
+    return X
+
+def score_matrix(X: np.ndarray):
+    """Apply the rule thresholds to every row at once, returning (classes, risk scores)"""
+    attendance = X[:, 0]
+    previous_gpa = X[:, 4]
+    total_score = X[:, 7]
+
+    high = (previous_gpa >= 3.5) & (attendance >= 90) & (total_score >= 80)
+    medium = (previous_gpa >= 2.5) & (attendance >= 75) & (total_score >= 60)
+
+    classes = np.select([high, medium], [2, 1], default=0)
+    risk_scores = np.select([high, medium], [0.1, 0.4], default=0.8)
+    return classes, risk_scores
+
+# The rules read only these columns: attendance, previous GPA and total score
+RULE_FEATURES = [0, 4, 7]
+
+# Exact Shapley attributions of the risk score against the default student,
+# computed over every combination of the three rule features in one call
+rule_explainer = explain.BaselineShapleyExplainer(
+    lambda X: score_matrix(X)[1],
+    np.asarray(explain.DEFAULT_BACKGROUND[0]),
+    features=RULE_FEATURES
+)
+
+def generate_recommendations(X: np.ndarray, classes: np.ndarray) -> List[List[str]]:
+    """Generate recommendations for every row of a scored feature matrix"""
+    low_attendance = X[:, 0] < 75
+    low_study_hours = X[:, 5] < 20
+    low_gpa = X[:, 4] < 3.0
+
+    all_recommendations = []
+    for i, pred in enumerate(classes.tolist()):
+        recommendations = []
+        if pred == 0:  # Low
+            if low_attendance[i]:
+                recommendations.append("Improve attendance by attending all classes regularly.")
+            if low_study_hours[i]:
+                recommendations.append("Increase study hours to at least 20 hours per week.")
+            if low_gpa[i]:
+                recommendations.append("Focus on improving grades in core subjects.")
+            recommendations.append("Schedule a meeting with academic advisor for personalized guidance.")
+        elif pred == 1:  # Medium
+            recommendations.append("Maintain current study habits and attendance.")
+            recommendations.append("Consider joining study groups for peer learning.")
+        else:  # High
+            recommendations.append("Excellent performance! Keep up the good work.")
+            recommendations.append("Consider leadership roles or advanced courses.")
+        all_recommendations.append(recommendations)
+    return all_recommendations
+
+def score_requests(requests: List[PredictionRequest]) -> List[dict]:
+    """Score a list of requests in a single vectorized pass, preserving input order.
+
+    Uses the registry's current models when a version is published and the
+    rules otherwise. Rows whose feature vector is already cached for that
+    version are served from the cache; only the misses go through the model.
+    """
+    if not requests:
+        return []
+
+    # Read the served set once; the version is part of every cache key
+    models = predict.registry_models()
+    version = models.version if models is not None else MODEL_VERSION
+    X = build_feature_matrix(requests)
+    keys = [prediction_cache.key(row, version) for row in X[:, :len(RAW_FEATURES)]]
+    results = [prediction_cache.get(key) for key in keys]
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing and models is not None:
+        scored = predict.score_requests(models, [requests[i] for i in missing])
+        for i, result in zip(missing, scored):
+            results[i] = result
+            prediction_cache.put(keys[i], result)
+    elif missing:
+        X_missing = X[missing]
+        classes, risk_scores = score_matrix(X_missing)
+        recommendations = generate_recommendations(X_missing, classes)
+        attributions = explain.attribution_dicts(rule_explainer.explain(X_missing))
+        for i, pred, risk, recs, feature_importance in zip(
+            missing, classes.tolist(), risk_scores.tolist(), recommendations, attributions
+        ):
+            results[i] = {
+                "predicted_performance": PREDICTION_MAP[pred],
+                "risk_score": risk,
+                "recommendations": recs,
+                "feature_importance": feature_importance,
+                "model_version": MODEL_VERSION
+            }
+            prediction_cache.put(keys[i], results[i])
+
+    return results
+
+def warm_up():
+    """Exercise the scoring path once (bypassing the cache) so the first request is not slower"""
+    X = build_feature_matrix([PredictionRequest(student_id="warmup")])
+    classes, _ = score_matrix(X)
+    generate_recommendations(X, classes)
+    rule_explainer.explain(X)
 
 @router.post("/predict", response_model=PredictionResponse)
 def predict_performance(request: PredictionRequest):
     # Simple rule-based prediction without ML libraries
-    data = {
-        'attendance_percentage': request.attendance_percentage,
-        'internal_marks': request.internal_marks,
-        'assignment_scores': request.assignment_scores,
-        'lab_performance': request.lab_performance,
-        'previous_gpa': request.previous_gpa,
-        'study_hours': request.study_hours,
-        'participation_metrics': request.participation_metrics,
-    }
-    
-    # Simple scoring logic
-    total_score = (data['internal_marks'] + data['assignment_scores'] + data['lab_performance']) / 3
-    academic_engagement = data['attendance_percentage'] * data['participation_metrics'] / 100
-    
-    # Rule-based prediction
-    if data['previous_gpa'] >= 3.5 and data['attendance_percentage'] >= 90 and total_score >= 80:
-        prediction = 'High'
-        risk_score = 0.1
-    elif data['previous_gpa'] >= 2.5 and data['attendance_percentage'] >= 75 and total_score >= 60:
-        prediction = 'Medium'
-        risk_score = 0.4
-    else:
-        prediction = 'Low'
-        risk_score = 0.8
-    
-    # Feature importance
-    feature_importance = {
-        'previous_gpa': 0.35,
-        'attendance_percentage': 0.28,
-        'study_hours': 0.18,
-        'total_score': 0.12,
-        'participation_metrics': 0.07
-    }
-    
-    # Generate recommendations
-    recommendations = []
-    if prediction == 'Low':
-        if data.get('attendance_percentage', 0) < 75:
-            recommendations.append("Improve attendance by attending all classes regularly.")
-        if data.get('study_hours', 0) < 20:
-            recommendations.append("Increase study hours to at least 20 hours per week.")
-        if data.get('previous_gpa', 0) < 3.0:
-            recommendations.append("Focus on improving grades in core subjects.")
-        recommendations.append("Schedule a meeting with academic advisor for personalized guidance.")
-    elif prediction == 'Medium':
-        recommendations.append("Maintain current study habits and attendance.")
-        recommendations.append("Consider joining study groups for peer learning.")
-    else:  # High
-        recommendations.append("Excellent performance! Keep up the good work.")
-        recommendations.append("Consider leadership roles or advanced courses.")
-    
-    return PredictionResponse(
-        predicted_performance=prediction,
-        risk_score=risk_score,
-        recommendations=recommendations,
-        feature_importance=feature_importance
-    )
+    result = score_requests([request])[0]
+    return PredictionResponse(**result)
+
+@router.post("/predict/batch", response_model=List[BatchPredictionResponse])
+def predict_performance_batch(requests: List[PredictionRequest]):
+    """Score many students in one call; results are returned in input order"""
+    results = score_requests(requests)
+    return [
+        BatchPredictionResponse(student_id=request.student_id, **result)
+        for request, result in zip(requests, results)
+    ]
+
+@router.get("/metrics")
+def get_metrics():
+    """Prediction cache counters"""
+    return {"prediction_cache": prediction_cache.stats()}
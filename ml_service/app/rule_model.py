@@ -0,0 +1,53 @@
+import numpy as np
+
+# Rule-based AI model implementations for demo purposes. The unversioned pickles
+# in models/ are instances of this class, so it must stay importable for them to load.
+class RuleBasedModel:
+    # Scoring parameters, also read by the compact artifact exporter
+    WEIGHTS = [0.2, 0.2, 0.15, 0.15, 20, 0.5, 0.1]
+    DEFAULTS = [75, 70, 75, 70, 3.0, 20, 75]  # Used when a row has fewer features
+    THRESHOLDS = [70, 85]  # Minimum score for Medium, High
+    CLASS_PROBABILITIES = [[0.7, 0.2, 0.1], [0.2, 0.6, 0.2], [0.1, 0.2, 0.7]]  # Low, Medium, High
+
+    def __init__(self, name):
+        self.name = name
+        self.is_fitted = False
+
+    def fit(self, X, y):
+        self.is_fitted = True
+        self.classes_ = list(set(y))
+        return self
+
+    def _feature_matrix(self, X):
+        """2-D float array of the weighted features; short rows are padded with DEFAULTS"""
+        n_features = len(self.WEIGHTS)
+        try:
+            X = np.asarray(X, dtype=np.float64)
+        except ValueError:
+            # Ragged input: pad row by row
+            X = np.array([list(row[:n_features]) + self.DEFAULTS[len(row):] for row in X], dtype=np.float64)
+        if X.size == 0:
+            return np.empty((0, n_features))
+        if X.shape[1] < n_features:
+            padded = np.tile(np.asarray(self.DEFAULTS, dtype=np.float64), (X.shape[0], 1))
+            padded[:, :X.shape[1]] = X
+            X = padded
+        return X[:, :n_features]
+
+    def predict_with_proba(self, X):
+        """Score every row in one pass, returning (classes, probabilities) as ndarrays"""
+        if not self.is_fitted:
+            raise ValueError("Model not fitted")
+
+        # Feature order: attendance, internal_marks, assignment_scores, lab_performance, previous_gpa, study_hours, participation_metrics, total_score, academic_engagement
+        scores = self._feature_matrix(X) @ np.asarray(self.WEIGHTS, dtype=np.float64)
+        predictions = np.select(
+            [scores >= self.THRESHOLDS[1], scores >= self.THRESHOLDS[0]], [2, 1], default=0  # High, Medium, Low
+        )
+        return predictions, np.asarray(self.CLASS_PROBABILITIES, dtype=np.float64)[predictions]
+
+    def predict(self, X):
+        return self.predict_with_proba(X)[0]
+
+    def predict_proba(self, X):
+        return self.predict_with_proba(X)[1]
@@ -1,205 +1,300 @@
-import joblib
+import argparse
 import os
-import random
-
-# Rule-based AI model implementations for demo purposes
-class RuleBasedModel:
-    def __init__(self, name):
-        self.name = name
-        self.is_fitted = False
-    
-    def fit(self, X, y):
-        self.is_fitted = True
-        self.classes_ = list(set(y))
-        return self
-    
-    def predict(self, X):
-        if not self.is_fitted:
-            raise ValueError("Model not fitted")
-        
-        predictions = []
-        for row in X:
-            # Extract features (assuming order: attendance, internal_marks, assignment_scores, lab_performance, previous_gpa, study_hours, participation_metrics, total_score, academic_engagement)
-            attendance = row[0] if len(row) > 0 else 75
-            internal_marks = row[1] if len(row) > 1 else 70
-            assignment_scores = row[2] if len(row) > 2 else 75
-            lab_performance = row[3] if len(row) > 3 else 70
-            previous_gpa = row[4] if len(row) > 4 else 3.0
-            study_hours = row[5] if len(row) > 5 else 20
-            participation_metrics = row[6] if len(row) > 6 else 75
-            
-            # Rule-based prediction logic (weighted score)
-            score = (attendance * 0.2 + internal_marks * 0.2 + assignment_scores * 0.15 + 
-                    lab_performance * 0.15 + previous_gpa * 20 + study_hours * 0.5 + 
-                    participation_metrics * 0.1)
-            
-            if score >= 85:
-                pred = 2  # High
-            elif score >= 70:
-                pred = 1  # Medium
-            else:
-                pred = 0  # Low
-            
-            predictions.append(pred)
-        
-        return predictions
-    
-    def predict_proba(self, X):
-        # Simple probability calculation based on prediction
-        predictions = self.predict(X)
-        probas = []
-        for pred in predictions:
-            if pred == 2:  # High
-                proba = [0.1, 0.2, 0.7]
-            elif pred == 1:  # Medium
-                proba = [0.2, 0.6, 0.2]
-            else:  # Low
-                proba = [0.7, 0.2, 0.1]
-            probas.append(proba)
-        return probas
-
-def load_data():
-    # Generate synthetic data without numpy/pandas
-    random.seed(42)
-    n_samples = 1000
-    data = []
-    
-    for _ in range(n_samples):
-        attendance = random.uniform(50, 100)
-        internal_marks = random.uniform(30, 100)
-        assignment_scores = random.uniform(40, 100)
-        lab_performance = random.uniform(35, 100)
-        previous_gpa = random.uniform(2.0, 4.0)
-        study_hours = random.uniform(5, 40)
-        participation_metrics = random.uniform(20, 100)
-        
-        # Create target based on features
-        if (attendance > 80 and previous_gpa > 3.0 and study_hours > 20):
-            performance = 'High'
-        elif (attendance > 60 and previous_gpa > 2.5):
-            performance = 'Medium'
-        else:
-            performance = 'Low'
-        
-        data.append({
-            'features': [attendance, internal_marks, assignment_scores, lab_performance, previous_gpa, study_hours, participation_metrics],
-            'performance': performance
-        })
-    
-    return data
-
-def preprocess_data(data):
-    # Feature engineering
-    X = []
-    y = []
-    
-    for item in data:
-        features = item['features']
-        attendance, internal_marks, assignment_scores, lab_performance, previous_gpa, study_hours, participation_metrics = features
-        
-        # Add engineered features
-        total_score = (internal_marks + assignment_scores + lab_performance) / 3
-        academic_engagement = attendance * participation_metrics / 100
-        
-        full_features = features + [total_score, academic_engagement]
-        X.append(full_features)
-        
-        # Encode target
-        if item['performance'] == 'Low':
-            y.append(0)
-        elif item['performance'] == 'Medium':
-            y.append(1)
-        else:
-            y.append(2)
-    
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app.registry import publish_version, FEATURE_ORDER
+
+RAW_FEATURES = FEATURE_ORDER[:7]
+# Values used for missing inputs, matching the ML service request defaults
+FEATURE_DEFAULTS = {
+    'attendance_percentage': 75.0, 'internal_marks': 70.0, 'assignment_scores': 75.0,
+    'lab_performance': 70.0, 'previous_gpa': 3.0, 'study_hours': 20.0, 'participation_metrics': 75.0
+}
+LABELS = {'Low': 0, 'Medium': 1, 'High': 2}
+
+# Uniform ranges of the synthetic demo data
+SYNTHETIC_RANGES = {
+    'attendance_percentage': (50, 100), 'internal_marks': (30, 100), 'assignment_scores': (40, 100),
+    'lab_performance': (35, 100), 'previous_gpa': (2.0, 4.0), 'study_hours': (5, 40),
+    'participation_metrics': (20, 100)
+}
+
+BACKGROUND_ROWS = 100  # Training rows stored with each version for attributions
+
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017/student_performance")
+
+@contextmanager
+def timed(timings, stage):
+    """Record the wall time of a pipeline stage in seconds"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round(time.perf_counter() - start, 3)
+        print(f"[{stage}] {timings[stage]:.2f}s")
+
+def generate_synthetic_data(n_samples=1000, seed=42):
+    """Synthetic demo data, labelled with the original attendance/GPA/study-hours rule"""
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        name: rng.uniform(low, high, n_samples) for name, (low, high) in SYNTHETIC_RANGES.items()
+    })
+    high = (df['attendance_percentage'] > 80) & (df['previous_gpa'] > 3.0) & (df['study_hours'] > 20)
+    medium = (df['attendance_percentage'] > 60) & (df['previous_gpa'] > 2.5)
+    df['performance'] = np.select([high, medium], [2, 1], default=0)
+    return df
+
+def load_mongo_data(label_field, url=MONGODB_URL, batch_size=10000):
+    """Students with a recorded outcome, labelled with the value at `label_field` (a dotted path)
+
+    The label must be an observed outcome. current_prediction holds the served
+    model's own output, so training on it would only teach a model to copy its predecessor.
+    """
+    import pandas as pd
+    from pymongo import MongoClient
+
+    if not label_field:
+        raise ValueError("--label-field is required for the mongo source")
+    if label_field.split('.')[0] == 'current_prediction':
+        raise ValueError("--label-field must name a recorded outcome, not the model's own current_prediction")
+
+    def label(doc):
+        value = doc
+        for part in label_field.split('.'):
+            value = value.get(part) if isinstance(value, dict) else None
+        return value
+
+    client = MongoClient(url)
+    try:
+        db = client.get_default_database(default="student_performance")
+        projection = {'_id': 0, label_field: 1}
+        projection.update({name: 1 for name in RAW_FEATURES})
+        cursor = db.students.find({label_field: {'$ne': None}}, projection, batch_size=batch_size)
+        records = ([doc.get(name) for name in RAW_FEATURES] + [label(doc)] for doc in cursor)
+        return pd.DataFrame.from_records(records, columns=RAW_FEATURES + ['performance'])
+    finally:
+        client.close()
+
+def load_file_data(path):
+    """Load a Parquet or CSV export with the raw feature columns and a performance label"""
+    import pandas as pd
+
+    columns = RAW_FEATURES + ['performance']
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, usecols=columns)
+
+def load_data(source='synthetic', path=None, n_samples=1000, mongodb_url=MONGODB_URL, label_field=None):
+    if source == 'mongo':
+        return load_mongo_data(label_field, mongodb_url)
+    if source == 'file':
+        if not path:
+            raise ValueError("--path is required for the file source")
+        return load_file_data(path)
+    return generate_synthetic_data(n_samples)
+
+def preprocess_data(df):
+    """Vectorized feature engineering; returns (X, y) with X in FEATURE_ORDER"""
+    from pandas.api.types import is_numeric_dtype
+
+    labels = df['performance']
+    if not is_numeric_dtype(labels):
+        labels = labels.map(LABELS)
+    labelled = labels.notna().to_numpy()
+    if not labelled.all():
+        print(f"Dropping {int((~labelled).sum())} rows without a known performance label")
+
+    raw = df.loc[labelled, RAW_FEATURES].astype(float).fillna(FEATURE_DEFAULTS).to_numpy()
+    X = np.empty((raw.shape[0], len(FEATURE_ORDER)), dtype=np.float64)
+    X[:, :len(RAW_FEATURES)] = raw
+    X[:, 7] = raw[:, 1:4].mean(axis=1)  # total_score
+    X[:, 8] = raw[:, 0] * raw[:, 6] / 100  # academic_engagement
+    y = labels[labelled].to_numpy().astype(np.int64)
     return X, y
 
-def train_models(X, y):
+def build_models(seed=42):
+    """Unfitted estimators for each model family; XGBoost is skipped if it is not installed"""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    # Estimators run single-threaded; parallelism comes from running folds side by side
     models = {
-        'Random Forest': RuleBasedModel('Random Forest'),
-        'XGBoost': RuleBasedModel('XGBoost'),
-        'Logistic Regression': RuleBasedModel('Logistic Regression'),
-        'Neural Network': RuleBasedModel('Neural Network')
+        'Random Forest': RandomForestClassifier(
+            n_estimators=100, max_depth=12, min_samples_leaf=5, random_state=seed, n_jobs=1
+        ),
+        'Logistic Regression': Pipeline([
+            ('scaler', StandardScaler()),
+            ('model', LogisticRegression(max_iter=1000))
+        ]),
+        'Neural Network': Pipeline([
+            ('scaler', StandardScaler()),
+            ('model', MLPClassifier(hidden_layer_sizes=(100, 50), max_iter=500,
+                                    early_stopping=True, random_state=seed))
+        ])
     }
-    
-    trained_models = {}
-    scores = {}
-    
-    for name, model in models.items():
-        model.fit(X, y)
-        trained_models[name] = model
-        scores[name] = {
-            'cv_f1': 0.85,  # Fixed score for rule-based
-            'cv_std': 0.02
-        }
-    
-    return trained_models, scores
-
-def evaluate_models(models, X_test, y_test):
-    results = {}
-    for name, model in models.items():
-        y_pred = model.predict(X_test)
-        # Simple accuracy calculation
-        correct = sum(1 for true, pred in zip(y_test, y_pred) if true == pred)
-        accuracy = correct / len(y_test)
-        
-        results[name] = {
-            'accuracy': accuracy,
-            'precision': accuracy * 0.95,  # Approximate
-            'recall': accuracy * 0.95,
-            'f1': accuracy * 0.95
+    try:
+        from xgboost import XGBClassifier
+        models['XGBoost'] = XGBClassifier(
+            n_estimators=200, max_depth=6, tree_method='hist', random_state=seed, n_jobs=1
+        )
+    except ImportError:
+        print("xgboost is not installed; skipping the XGBoost model")
+    return models
+
+def score_predictions(y_true, y_pred):
+    from sklearn.metrics import accuracy_score, precision_recall_fscore_support
+
+    precision, recall, f1, _ = precision_recall_fscore_support(
+        y_true, y_pred, average='macro', zero_division=0
+    )
+    return {
+        'accuracy': float(accuracy_score(y_true, y_pred)),
+        'precision': float(precision),
+        'recall': float(recall),
+        'f1': float(f1)
+    }
+
+def _fit_and_score(name, estimator, X_train, y_train, X_test, y_test):
+    from sklearn.base import clone
+
+    start = time.perf_counter()
+    model = clone(estimator).fit(X_train, y_train)
+    scores = score_predictions(y_test, model.predict(X_test))
+    scores['fit_seconds'] = round(time.perf_counter() - start, 3)
+    return name, model, scores
+
+def cross_validate_models(models, X, y, folds=5, n_jobs=-1, max_rows=None, seed=42):
+    """Stratified k-fold CV of every model, running all (model, fold) fits in parallel.
+
+    With max_rows set, CV runs on a stratified sample of that size to bound the
+    cost on large datasets; the final models are still fitted on all training rows.
+    """
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import StratifiedKFold, train_test_split
+
+    if max_rows and len(y) > max_rows:
+        X, _, y, _ = train_test_split(X, y, train_size=max_rows, stratify=y, random_state=seed)
+
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed).split(X, y))
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_and_score)(name, estimator, X[train], y[train], X[test], y[test])
+        for name, estimator in models.items()
+        for train, test in splits
+    )
+
+    cv_scores = {}
+    for name in models:
+        f1 = np.array([scores['f1'] for result_name, _, scores in results if result_name == name])
+        accuracy = np.array([scores['accuracy'] for result_name, _, scores in results if result_name == name])
+        cv_scores[name] = {
+            'cv_f1': float(f1.mean()),
+            'cv_std': float(f1.std()),
+            'cv_accuracy': float(accuracy.mean()),
+            'folds': folds,
+            'rows': int(len(y))
         }
-    return results
-
-def save_models(models):
-    # Use absolute path to the models directory
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    model_dir = os.path.join(script_dir, '../../models')
-    print(f"Saving models to: {os.path.abspath(model_dir)}")
-    os.makedirs(model_dir, exist_ok=True)
-    
-    for name, model in models.items():
-        filename = name.lower().replace(' ', '_') + '.pkl'
-        filepath = os.path.join(model_dir, filename)
-        joblib.dump(model, filepath)
-        print(f"Saved {name} to {filepath}")
+    return cv_scores
+
+def train_models(models, X_train, y_train, X_test, y_test, n_jobs=-1):
+    """Fit every model on the full training split in parallel and score it on the test split"""
+    from joblib import Parallel, delayed
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_and_score)(name, estimator, X_train, y_train, X_test, y_test)
+        for name, estimator in models.items()
+    )
+    trained_models = {name: model for name, model, _ in results}
+    test_results = {name: scores for name, _, scores in results}
+    return trained_models, test_results
+
+def save_models(models, best_model_name, metrics, background=None):
+    # Publish as a new version in the model registry and make it current
+    version = publish_version(models, best_model=best_model_name, metrics=metrics, background=background)
+    print(f"Saved {', '.join(models)} as model version {version}")
+    return version
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the student performance models and publish them")
+    parser.add_argument('--source', choices=['synthetic', 'mongo', 'file'], default='synthetic',
+                        help="Training data: synthetic demo data, MongoDB students, or a Parquet/CSV export")
+    parser.add_argument('--path', help="Parquet or CSV file for the file source")
+    parser.add_argument('--mongodb-url', default=MONGODB_URL)
+    parser.add_argument('--label-field',
+                        help="Required for the mongo source: dotted path of the student field holding the observed "
+                             "outcome (Low/Medium/High or 0-2), e.g. final_performance. current_prediction is the "
+                             "model's own output and is refused as a label")
+    parser.add_argument('--samples', type=int, default=1000, help="Rows of synthetic data")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--cv-max-rows', type=int, default=200000,
+                        help="Cross-validate on a stratified sample of at most this many rows (0 for all)")
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--jobs', type=int, default=-1, help="Parallel workers (-1 for all cores)")
+    parser.add_argument('--no-publish', action='store_true', help="Report metrics without publishing a version")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    # Load and preprocess data
-    data = load_data()
-    X, y = preprocess_data(data)
-    
-    # Simple train/test split
-    n_samples = len(X)
-    random.seed(42)
-    indices = list(range(n_samples))
-    random.shuffle(indices)
-    split_idx = int(0.8 * n_samples)
-    X_train = [X[i] for i in indices[:split_idx]]
-    X_test = [X[i] for i in indices[split_idx:]]
-    y_train = [y[i] for i in indices[:split_idx]]
-    y_test = [y[i] for i in indices[split_idx:]]
-    
-    # Train models
-    models, cv_scores = train_models(X_train, y_train)
-    
-    # Evaluate
-    test_results = evaluate_models(models, X_test, y_test)
-    
+    from sklearn.model_selection import train_test_split
+
+    args = parse_args()
+    timings = {}
+
+    with timed(timings, 'load'):
+        df = load_data(args.source, args.path, args.samples, args.mongodb_url, args.label_field)
+    print(f"Loaded {len(df)} rows from {args.source}")
+
+    with timed(timings, 'features'):
+        X, y = preprocess_data(df)
+        del df
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=args.test_size, stratify=y, random_state=42
+    )
+    models = build_models()
+
+    with timed(timings, 'cross_validation'):
+        cv_scores = cross_validate_models(
+            models, X_train, y_train, folds=args.folds, n_jobs=args.jobs, max_rows=args.cv_max_rows
+        )
+
+    with timed(timings, 'training'):
+        trained_models, test_results = train_models(models, X_train, y_train, X_test, y_test, n_jobs=args.jobs)
+
     # Print results
     print("Cross-Validation Scores:")
     for name, scores in cv_scores.items():
         print(f"{name}: F1 = {scores['cv_f1']:.3f} (+/- {scores['cv_std']*2:.3f})")
-    
+
     print("\nTest Scores:")
     for name, scores in test_results.items():
-        print(f"{name}: Acc={scores['accuracy']:.3f}, F1={scores['f1']:.3f}")
-    
+        print(f"{name}: Acc={scores['accuracy']:.3f}, Precision={scores['precision']:.3f}, "
+              f"Recall={scores['recall']:.3f}, F1={scores['f1']:.3f}")
+
     # Select best model
     best_model_name = max(test_results, key=lambda x: test_results[x]['f1'])
     print(f"\nBest Model: {best_model_name}")
-    
-    # Save all models
-    save_models(models)
-    
-    print("Models saved to models/ directory")
\ No newline at end of file
+
+    if args.no_publish:
+        print("\nTimings (s):", timings)
+    else:
+        with timed(timings, 'publish'):
+            metrics = {
+                'cv': cv_scores,
+                'test': test_results,
+                'rows': {'train': int(len(y_train)), 'test': int(len(y_test))},
+                'source': args.source,
+                'timings': timings
+            }
+            # Reference rows for the service's feature attributions
+            sample = np.random.default_rng(42).choice(len(X_train), min(BACKGROUND_ROWS, len(X_train)), replace=False)
+            version = save_models(trained_models, best_model_name, metrics, background=X_train[sample])
+        print(f"Models saved to the model registry as {version}")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the ML service as `app`, like the service does when started from ml_service/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app import cache as cache_module
+from app.cache import PredictionCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+def features(*values):
+    return np.asarray(values, dtype=np.float64)
+
+def test_entries_expire_after_ttl(clock):
+    cache = PredictionCache(max_size=10, ttl=60)
+    key = cache.key(features(1, 2, 3))
+    cache.put(key, {"risk_score": 0.5})
+
+    clock.now += 59
+    assert cache.get(key) == {"risk_score": 0.5}
+    clock.now += 1
+    assert cache.get(key) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["size"]) == (1, 1, 1, 0)
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = PredictionCache(max_size=2, ttl=60)
+    a, b, c = (cache.key(features(i)) for i in range(3))
+    cache.put(a, {"id": "a"})
+    cache.put(b, {"id": "b"})
+    cache.get(a)  # a becomes the most recently used
+    cache.put(c, {"id": "c"})
+
+    assert cache.get(b) is None
+    assert cache.get(a) == {"id": "a"}
+    assert cache.get(c) == {"id": "c"}
+    assert cache.stats()["evictions"] == 1
+
+def test_rewriting_an_entry_renews_its_ttl(clock):
+    cache = PredictionCache(max_size=10, ttl=60)
+    key = cache.key(features(1))
+    cache.put(key, {"v": 1})
+    clock.now += 50
+    cache.put(key, {"v": 2})
+    clock.now += 50
+    assert cache.get(key) == {"v": 2}
+
+def test_keys_depend_on_features_and_model_version():
+    cache = PredictionCache()
+    row = features(85, 75, 80)
+    assert cache.key(row) == cache.key(row.tolist())
+    assert cache.key(row) != cache.key(features(85, 75, 81))
+    assert cache.key(row, "v1") != cache.key(row, "v2")
+
+def test_model_version_change_drops_entries():
+    cache = PredictionCache()
+    cache.set_model_version("v1")
+    key = cache.key(features(1))
+    cache.put(key, {"v": 1})
+    cache.set_model_version("v1")
+    assert cache.get(key) == {"v": 1}
+
+    cache.set_model_version("v2")
+    assert cache.stats()["size"] == 0
+    assert cache.key(features(1)) != key
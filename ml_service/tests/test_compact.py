@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from app import compact, explain
+from app.rule_model import RuleBasedModel
+
+pytest.importorskip("sklearn")
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+def training_data(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform([50, 30, 40, 35, 2.0, 5, 20, 35, 10], [100, 100, 100, 100, 4.0, 40, 100, 100, 100], (n, 9))
+    y = (X[:, 0] > 75).astype(int) + (X[:, 4] > 3.0)
+    return X, y
+
+def round_trip(model, tmp_path):
+    path = str(tmp_path / "model")
+    compact.export_model(model, path)
+    return compact.load_model(path)
+
+SKLEARN_MODELS = {
+    "random_forest": lambda: RandomForestClassifier(n_estimators=20, max_depth=8, random_state=0),
+    "decision_tree": lambda: DecisionTreeClassifier(max_depth=6, random_state=0),
+    "logistic_regression": lambda: LogisticRegression(max_iter=2000),
+    "scaled_logistic_regression": lambda: Pipeline([
+        ("scaler", StandardScaler()), ("model", LogisticRegression(max_iter=1000))
+    ]),
+}
+
+@pytest.mark.filterwarnings("ignore:lbfgs failed to converge")  # Unscaled features; equivalence still holds
+@pytest.mark.parametrize("name", sorted(SKLEARN_MODELS))
+def test_compact_matches_sklearn(name, tmp_path):
+    X, y = training_data()
+    model = SKLEARN_MODELS[name]().fit(X, y)
+    loaded = round_trip(model, tmp_path)
+
+    X_new, _ = training_data(n=200, seed=1)
+    np.testing.assert_allclose(loaded.predict_proba(X_new), model.predict_proba(X_new), atol=1e-9)
+    np.testing.assert_array_equal(loaded.predict(X_new), model.predict(X_new))
+
+def test_binary_linear_model_matches_sklearn(tmp_path):
+    X, y = training_data()
+    model = LogisticRegression(max_iter=2000).fit(X, (y == 0).astype(int))
+    loaded = round_trip(model, tmp_path)
+    np.testing.assert_allclose(loaded.predict_proba(X), model.predict_proba(X), atol=1e-9)
+
+def test_rule_model_export_matches_original(tmp_path):
+    model = RuleBasedModel("Logistic Regression").fit([], [0, 1, 2])
+    loaded = round_trip(model, tmp_path)
+    X, _ = training_data(n=200)
+    for rows in (X, X[:, :5]):  # Short rows are padded with the defaults
+        np.testing.assert_array_equal(loaded.predict(rows), model.predict(rows))
+        np.testing.assert_allclose(loaded.predict_proba(rows), model.predict_proba(rows))
+
+def test_non_standard_scaler_pipeline_is_not_exported():
+    X, y = training_data()
+    model = Pipeline([("scaler", MinMaxScaler()), ("model", LogisticRegression(max_iter=1000))]).fit(X, y)
+    assert not compact.can_export(model)
+
+def test_compact_forest_attributions_are_exact(tmp_path):
+    X, y = training_data()
+    forest = round_trip(RandomForestClassifier(n_estimators=20, max_depth=8, random_state=0).fit(X, y), tmp_path)
+    explainer = explain.build_explainer(forest, X[:50].tolist())
+    assert isinstance(explainer, explain.TreeBaselineShapleyExplainer)
+
+    X_new, _ = training_data(n=20, seed=1)
+    attributions = explainer.explain(X_new)
+    low = forest.predict_proba(X_new)[:, explain.EXPLAINED_CLASS]
+    np.testing.assert_allclose(attributions.sum(axis=1) + explainer.expected_value, low, atol=1e-9)
+
+    generic = explain.BaselineShapleyExplainer(
+        lambda rows: forest.predict_proba(rows)[:, explain.EXPLAINED_CLASS], X[:50].mean(axis=0)
+    )
+    np.testing.assert_allclose(attributions, generic.explain(X_new), atol=1e-9)